@@ -0,0 +1,54 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Compare daily measures with total guests alone"
+
+#######################################################################
+
+import sys
+import timeit
+import pandas as pd
+from hotel_booking_app.src.processing.aggregation import aggregate_daily
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+from hotel_booking_app.src.processing.occupancy import \
+    calculate_total_guests
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def main(sizes, selected_date='2016-08-01', time_span=30):
+    for n_rows in sizes:
+        df = generate_bookings(n_rows)
+        df['hotel'] = df['hotel'].astype('category')
+        df['market_segment'] = df['market_segment'].astype('category')
+
+        dataset = BookingDataset(df)
+        df_active_bookings = dataset.get_active_bookings(selected_date,
+                                                         time_span)
+
+        # Daily measures also count bookings leaving on the selected date
+        df_bookings = dataset.get_active_bookings(
+            (pd.to_datetime(selected_date) - pd.Timedelta(days=1))
+            .strftime('%Y-%m-%d'), time_span + 1)
+
+        time_guests = min(timeit.repeat(
+            lambda: calculate_total_guests(df_active_bookings,
+                                           selected_date, time_span),
+            number=1, repeat=5))
+        time_measures = min(timeit.repeat(
+            lambda: aggregate_daily(df_bookings, selected_date, time_span),
+            number=1, repeat=5))
+        time_grouped = min(timeit.repeat(
+            lambda: aggregate_daily(df_bookings, selected_date, time_span,
+                                    dimensions=['hotel', 'market_segment']),
+            number=1, repeat=5))
+
+        print('%9d rows, %8d active: guests %8.4f s, all measures '
+              '%8.4f s (%4.1fx), per hotel and segment %8.4f s (%4.1fx)'
+              % (n_rows, len(df_active_bookings), time_guests,
+                 time_measures, time_measures / time_guests, time_grouped,
+                 time_grouped / time_guests))
+
+
+if __name__ == '__main__':
+    # Dataset sizes can be passed as arguments, e.g. 10000 10000000
+    main([int(size) for size in sys.argv[1:]]
+         or [100000, 1000000, 2000000])
@@ -0,0 +1,63 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Compare derivation of arrival and leaving dates"
+
+#######################################################################
+
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from hotel_booking_app.src.processing.occupancy import get_stay_days, \
+    to_day_numbers
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def parse_dates(df):
+    """
+    Previous derivation of arrival and leaving dates, which parses month
+    names and assembles dates from year, month and day. Used as reference.
+    """
+
+    df2 = pd.DataFrame({
+        'year': df['arrival_date_year'],
+        'month': pd.to_datetime(df['arrival_date_month'],
+                                format='%B').dt.month,
+        'day': df['arrival_date_day_of_month']})
+
+    arrival_date = pd.to_datetime(df2)
+    leaving_date = arrival_date \
+        + pd.to_timedelta(df['stays_in_weekend_nights']
+                          + df['stays_in_week_nights'], unit='D')
+
+    return arrival_date, leaving_date
+
+
+def main(sizes):
+    for n_rows in sizes:
+        df = generate_bookings(n_rows)
+
+        # Compare with month names as text and as categories
+        for dtype in [object, 'category']:
+            df['arrival_date_month'] = df['arrival_date_month'].astype(dtype)
+
+            arrival_date, leaving_date = parse_dates(df)
+            arrival_days, leaving_days = get_stay_days(df)
+            assert np.array_equal(to_day_numbers(arrival_date), arrival_days)
+            assert np.array_equal(to_day_numbers(leaving_date), leaving_days)
+
+            time_parse = min(timeit.repeat(lambda: parse_dates(df),
+                                           number=1, repeat=3))
+            time_lookup = min(timeit.repeat(lambda: get_stay_days(df),
+                                            number=1, repeat=3))
+
+            print('%9d rows, months as %-8s: parse %8.4f s, '
+                  'lookup %8.4f s, speed up %6.1fx'
+                  % (n_rows, dtype if dtype == 'category' else 'text',
+                     time_parse, time_lookup, time_parse / time_lookup))
+
+
+if __name__ == '__main__':
+    # Dataset sizes can be passed as arguments, e.g. 10000 10000000
+    main([int(size) for size in sys.argv[1:]]
+         or [100000, 1000000, 2000000])
@@ -0,0 +1,57 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Measure throughput of parallel analysis of several hotels"
+
+#######################################################################
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from hotel_booking_app.src.processing.parallel import analyse_hotels
+from benchmarks.synthetic_bookings import write_bookings
+
+
+def main(n_hotels, n_rows):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file_paths = []
+        for i in range(n_hotels):
+            csv_file_paths.append(os.path.join(tmp_dir, 'hotel_%d.csv' % i))
+            write_bookings(csv_file_paths[-1], n_rows, seed=i)
+
+        # The same bookings in one file, partitioned by the hotel column
+        all_hotels_path = os.path.join(tmp_dir, 'all_hotels.csv')
+        with open(all_hotels_path, 'wb') as all_hotels_file:
+            for i, csv_file_path in enumerate(csv_file_paths):
+                with open(csv_file_path, 'rb') as csv_file:
+                    if i:
+                        csv_file.readline()
+                    shutil.copyfileobj(csv_file, all_hotels_file)
+
+        # Cleaned csv files are not saved, results only to the temporary
+        # directory
+        modes = [('files', csv_file_paths, False),
+                 ('by hotel', [all_hotels_path], True)]
+
+        for mode, paths, partition_by_hotel in modes:
+            processes = 1
+            while processes <= min(n_hotels, os.cpu_count()):
+                start = time.perf_counter()
+                analyse_hotels(paths, os.path.join(tmp_dir, 'results'),
+                               '2016-08-01', 7,
+                               partition_by_hotel=partition_by_hotel,
+                               processes=processes)
+                seconds = time.perf_counter() - start
+
+                print('%-8s %2d processes: %8.2f s, %10.0f rows/s'
+                      % (mode, processes, seconds,
+                         n_hotels * n_rows / seconds))
+
+                processes *= 2
+
+
+if __name__ == '__main__':
+    # Number of hotels and bookings per hotel
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 250000)
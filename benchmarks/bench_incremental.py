@@ -0,0 +1,94 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Compare applying a delta with analysing all bookings again"
+
+#######################################################################
+
+import sys
+import tempfile
+import timeit
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.preparation.schema as schema
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+from hotel_booking_app.src.processing.incremental import IncrementalStore
+from hotel_booking_app.src.processing.occupancy import \
+    calculate_total_guests
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def create_delta(df, n_changes, seed=0):
+    """
+    Create a mixed delta like a nightly export. Cancellations contain only
+    booking_id and is_canceled, changed and new bookings contain all
+    columns.
+    """
+
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(df.shape[0], 2 * n_changes, replace=False)
+
+    df_cancelled = pd.DataFrame({
+        'booking_id': df['booking_id'].values[positions[:n_changes]],
+        'is_canceled': 1})
+
+    df_changed = df.iloc[positions[n_changes:]].copy()
+    df_changed['adults'] = df_changed['adults'] + 1
+
+    df_new = generate_bookings(n_changes, seed + 1)
+    df_new.insert(0, 'booking_id',
+                  np.arange(df.shape[0], df.shape[0] + n_changes))
+
+    # Delta is converted like a delta read by the command line
+    return schema.convert_types(
+        pd.concat([df_cancelled, df_changed, df_new], ignore_index=True),
+        nullable=True)
+
+
+def main(sizes, selected_date='2016-08-01', time_span=30):
+    for n_rows in sizes:
+        df = generate_bookings(n_rows)
+        df.insert(0, 'booking_id', np.arange(n_rows))
+        df = schema.convert_types(df)
+
+        n_changes = max(n_rows // 1000, 1)
+        df_delta = create_delta(df, n_changes)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = IncrementalStore.create(tmp_dir, df, ['booking_id'])
+            time_delta = timeit.timeit(
+                lambda: store.apply_delta(df_delta), number=1)
+
+            # Empty cells of the delta keep the stored values
+            df_stored = store.read_bookings().set_index('booking_id')
+            df_expected = pd.concat(
+                [df, df_delta.iloc[2 * n_changes:]], ignore_index=True) \
+                .set_index('booking_id')
+            df_expected.loc[df_delta['booking_id'][:n_changes],
+                            'is_canceled'] = 1
+            df_expected.loc[df_delta['booking_id'][n_changes:2 * n_changes],
+                            'adults'] += 1
+            df_expected = df_expected.loc[df_stored.index]
+            assert df_stored.astype(str).equals(df_expected.astype(str))
+
+            dataset = BookingDataset(df_expected.reset_index())
+            time_full = min(timeit.repeat(
+                lambda: calculate_total_guests(
+                    BookingDataset(df_expected.reset_index())
+                    .get_active_bookings(selected_date, time_span),
+                    selected_date, time_span), number=1, repeat=3))
+
+            assert store.calculate_total_guests(
+                selected_date, time_span).to_csv(index=False) \
+                == calculate_total_guests(
+                    dataset.get_active_bookings(selected_date, time_span),
+                    selected_date, time_span).to_csv(index=False)
+
+        print('%9d rows, %6d changes: apply delta %8.4f s, '
+              'analyse all bookings %8.4f s'
+              % (n_rows, df_delta.shape[0], time_delta, time_full))
+
+
+if __name__ == '__main__':
+    # Dataset sizes can be passed as arguments, e.g. 10000 10000000
+    main([int(size) for size in sys.argv[1:]]
+         or [10000, 100000, 1000000])
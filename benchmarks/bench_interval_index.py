@@ -0,0 +1,79 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Measure active bookings query latency"
+
+#######################################################################
+
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+from hotel_booking_app.src.processing.occupancy import to_day_numbers
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def scan_active_positions(df, selected_date, time_span):
+    """
+    Get row positions of active bookings with a boolean scan over all rows.
+    Used as reference.
+    """
+
+    first_day = to_day_numbers([pd.to_datetime(selected_date)])[0]
+
+    return np.flatnonzero(
+        ~((df['leaving_day'] <= first_day)
+          | (df['arrival_day'] > first_day + time_span))
+        & (df['is_canceled'] == 0))
+
+
+def main(sizes):
+    time_span = 7
+    selected_dates = [str(date.date()) for date in
+                      pd.date_range('2015-06-01', '2018-08-01', freq='17D')]
+
+    for n_rows, long_stay in [(n_rows, long_stay) for n_rows in sizes
+                              for long_stay in (False, True)]:
+        df = generate_bookings(n_rows)
+
+        if long_stay:
+            # A single long stay arriving first must not slow down all
+            # following queries
+            df.loc[0, ['arrival_date_year', 'arrival_date_month',
+                       'arrival_date_week_number',
+                       'arrival_date_day_of_month',
+                       'stays_in_week_nights', 'is_canceled']] = \
+                [2015, 'July', 27, 1, 3000, 0]
+
+        dataset = BookingDataset(df)
+
+        time_build = timeit.timeit(lambda: dataset.interval_index, number=1)
+
+        for selected_date in selected_dates:
+            assert np.array_equal(
+                dataset.get_active_positions(selected_date, time_span),
+                scan_active_positions(dataset.data, selected_date, time_span))
+
+        def query_all(query):
+            for date in selected_dates:
+                query(date)
+
+        time_index = min(timeit.repeat(
+            lambda: query_all(lambda date: dataset.get_active_positions(
+                date, time_span)), number=1, repeat=3)) / len(selected_dates)
+        time_scan = min(timeit.repeat(
+            lambda: query_all(lambda date: scan_active_positions(
+                dataset.data, date, time_span)), number=1, repeat=3)) \
+            / len(selected_dates)
+
+        print('%9d rows%s: index build %8.4f s, query %8.3f ms, '
+              'scan %8.3f ms, speed up %7.1fx'
+              % (n_rows, ' with long stay' if long_stay else '',
+                 time_build, time_index * 1000, time_scan * 1000,
+                 time_scan / time_index))
+
+
+if __name__ == '__main__':
+    # Dataset sizes can be passed as arguments, e.g. 10000 10000000
+    main([int(size) for size in sys.argv[1:]]
+         or [10000, 100000, 1000000])
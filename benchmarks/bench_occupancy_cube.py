@@ -0,0 +1,60 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Compare total guests from bookings and from the cube"
+
+#######################################################################
+
+import sys
+import timeit
+import pandas as pd
+import hotel_booking_app.src.processing.occupancy_cube as occupancy_cube
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+from hotel_booking_app.src.processing.occupancy import \
+    calculate_total_guests
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def query_bookings(dataset, selected_date, time_span):
+    """
+    Calculate total guests from the bookings. Used as reference.
+    """
+    return calculate_total_guests(
+        dataset.get_active_bookings(selected_date, time_span),
+        selected_date, time_span)
+
+
+def main(sizes, selected_date='2016-08-01', time_span=30):
+    for n_rows in sizes:
+        df = generate_bookings(n_rows)
+        df['hotel'] = df['hotel'].astype('category')
+        df['assigned_room_type'] = \
+            df['assigned_room_type'].astype('category')
+
+        dataset = BookingDataset(df)
+        time_build = min(timeit.repeat(
+            lambda: occupancy_cube.build_cube(df), number=1, repeat=3))
+        df_cube = occupancy_cube.build_cube(df)
+
+        pd.testing.assert_frame_equal(
+            query_bookings(dataset, selected_date, time_span),
+            occupancy_cube.query_total_guests(df_cube, selected_date,
+                                              time_span))
+
+        time_bookings = min(timeit.repeat(
+            lambda: query_bookings(dataset, selected_date, time_span),
+            number=1, repeat=3))
+        time_cube = min(timeit.repeat(
+            lambda: occupancy_cube.query_total_guests(
+                df_cube, selected_date, time_span),
+            number=1, repeat=3))
+
+        print('%9d rows, %6d cube rows: build %8.4f s, bookings %8.4f s, '
+              'cube %8.4f s, speed up %6.1fx'
+              % (n_rows, len(df_cube), time_build, time_bookings,
+                 time_cube, time_bookings / time_cube))
+
+
+if __name__ == '__main__':
+    # Dataset sizes can be passed as arguments, e.g. 10000 10000000
+    main([int(size) for size in sys.argv[1:]]
+         or [100000, 1000000, 2000000])
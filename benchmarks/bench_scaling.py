@@ -0,0 +1,170 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Measure how analysis stages scale with data size"
+
+#######################################################################
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic_bookings import write_bookings
+
+STAGES = ['import_clean_data', 'get_active_bookings',
+          'analyse_active_bookings', 'analyse_total_guests']
+SIZES = [10000, 100000, 1000000, 10000000]
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SELECTED_DATE = '2016-08-01'
+TIME_SPAN = 7
+
+
+def run_stage(stage, csv_file_path, tmp_dir):
+    """
+    Run one stage and print its wall time and peak memory as JSON.
+    Every stage is run in its own process, so peak memory of stages
+    does not influence each other.
+
+    :param stage: Name of stage
+    :param csv_file_path: Path of generated csv file
+    :param tmp_dir: Directory of result files
+    """
+
+    import hotel_booking_app.src.preparation.prepare_data as prep
+    import hotel_booking_app.src.processing.analyse_data as analyse
+
+    raw_file_path = os.path.join(tmp_dir, 'raw.csv')
+    stage_functions = {
+        'import_clean_data': lambda: prep.import_clean_data(
+            csv_file_path, raw_file_path, 0.8),
+        'get_active_bookings': lambda: analyse.get_active_bookings(
+            raw_file_path, SELECTED_DATE, TIME_SPAN),
+        'analyse_active_bookings': lambda: analyse.analyse_active_bookings(
+            raw_file_path, os.path.join(tmp_dir, 'active_bookings.csv'),
+            SELECTED_DATE, TIME_SPAN),
+        'analyse_total_guests': lambda: analyse.analyse_total_guests(
+            raw_file_path, os.path.join(tmp_dir, 'total_guests.csv'),
+            SELECTED_DATE, TIME_SPAN)}
+
+    start = time.perf_counter()
+    stage_functions[stage]()
+    seconds = time.perf_counter() - start
+
+    # Maximum resident set size is given in kilobytes on Linux
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    print(json.dumps({'seconds': seconds, 'peak_memory_mb': peak_memory}))
+
+
+def measure(sizes):
+    """
+    Generate csv files of all sizes and measure all stages.
+
+    :param sizes: List of numbers of bookings
+    :return: Dictionary of measurements per size and stage
+    """
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            csv_file_path = os.path.join(tmp_dir, 'bookings.csv')
+            write_bookings(csv_file_path, n_rows)
+
+            results[str(n_rows)] = {}
+            for stage in STAGES:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_scaling',
+                     '--run-stage', stage, csv_file_path, tmp_dir],
+                    check=True, capture_output=True, text=True).stdout
+                results[str(n_rows)][stage] = json.loads(output)
+
+                print('%9d rows  %-24s %9.3f s %9.1f MB'
+                      % (n_rows, stage,
+                         results[str(n_rows)][stage]['seconds'],
+                         results[str(n_rows)][stage]['peak_memory_mb']))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare measurements with baseline.
+
+    :param results: Dictionary of measurements per size and stage
+    :param baseline: Dictionary of baseline measurements
+    :param tolerance: Allowed relative increase, e.g. 0.25 for 25 percent
+    :return: List of regression messages
+    """
+
+    regressions = []
+
+    for n_rows, stages in results.items():
+        for stage, measurement in stages.items():
+            expected = baseline.get(n_rows, {}).get(stage)
+
+            if expected is None:
+                continue
+
+            for metric in ['seconds', 'peak_memory_mb']:
+                if measurement[metric] > expected[metric] * (1 + tolerance):
+                    regressions.append(
+                        '%s rows, %s: %s %.3f exceeds baseline %.3f'
+                        % (n_rows, stage, metric, measurement[metric],
+                           expected[metric]))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measure wall time and peak memory of all analysis '
+                    'stages and compare them with a baseline.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES,
+                        help='Numbers of bookings')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='Path of baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative increase over baseline')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Save measurements as baseline')
+    parser.add_argument('--run-stage', nargs=3,
+                        metavar=('STAGE', 'CSV_PATH', 'TMP_DIR'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage(*args.run_stage)
+        return
+
+    results = measure(args.sizes)
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    # Save measurements, if there is no baseline yet for them
+    if args.update_baseline or not baseline:
+        for n_rows, stages in results.items():
+            baseline.setdefault(n_rows, {}).update(stages)
+
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+
+        print('Baseline saved to %s' % args.baseline)
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    for regression in regressions:
+        print('REGRESSION: ' + regression)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Measure startup time of command line interface"
+
+#######################################################################
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def run(args):
+    """
+    Run python in a new process.
+
+    :param args: List of command line arguments of python
+    :return: Wall time (in seconds)
+    """
+
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, check=True,
+                   stdout=subprocess.DEVNULL)
+
+    return time.perf_counter() - start
+
+
+def main():
+    # Heavy modules must not be loaded for showing the help
+    loaded = subprocess.run(
+        [sys.executable, '-c',
+         'import sys\n'
+         'from hotel_booking_app.view.cli import create_parser\n'
+         'create_parser()\n'
+         'print(" ".join(m for m in ("pandas", "numpy", "tkinter")'
+         ' if m in sys.modules))'],
+        check=True, capture_output=True, text=True).stdout.strip()
+    print('modules loaded for --help: %s' % (loaded or 'none'))
+
+    print('python startup       %8.3f s'
+          % min(run(['-c', 'pass']) for _ in range(3)))
+    print('--help               %8.3f s'
+          % min(run(['-m', 'hotel_booking_app', '--help']) for _ in range(3)))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_file_path = os.path.join(tmp_dir, 'bookings.csv')
+        generate_bookings(100000).to_csv(csv_file_path, index=False)
+
+        print('analyse (100k rows)  %8.3f s'
+              % run(['-m', 'hotel_booking_app', 'analyse', csv_file_path,
+                     '--date', '2016-08-01', '--no-cache',
+                     '--output-dir', tmp_dir]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Compare total guests calculation with date range expansion"
+
+#######################################################################
+
+import os
+import tempfile
+import timeit
+import pandas as pd
+import hotel_booking_app.src.processing.analyse_data as analyse
+import hotel_booking_app.src.processing.occupancy as occupancy
+from benchmarks.synthetic_bookings import generate_bookings
+
+
+def date_range_total_guests(df_active_bookings, selected_date, time_span):
+    """
+    Previous implementation of the total guests calculation, which expands
+    every booking into a date range. Used as reference.
+    """
+
+    df_active_bookings = df_active_bookings.copy()
+    selected_date = pd.to_datetime(selected_date)
+
+    for column in ['arrival', 'leaving']:
+        df_active_bookings[column + '_date'] = pd.to_datetime(
+            df_active_bookings[column + '_day'].to_numpy()
+            .astype('datetime64[D]'))
+
+    df_active_bookings['booking_id'] = \
+        pd.factorize(df_active_bookings.apply(tuple, axis=1))[0] + 1
+
+    df_stayed_dates = pd.concat([pd.Series(r.booking_id,
+                                           pd.date_range(start=r.arrival_date,
+                                                         end=r.leaving_date,
+                                                         freq='D'))
+                                 for r in
+                                 df_active_bookings.itertuples()]).reset_index()
+
+    df_stayed_dates.columns = ['stayed_date', 'booking_id']
+
+    df_stayed_dates = pd.merge(df_stayed_dates, df_active_bookings[
+        ['booking_id', 'adults', 'children', 'babies']],
+                               on=['booking_id'])
+
+    df_stayed_dates['children'] = df_stayed_dates['children'].astype(int)
+
+    df_total_guests = df_stayed_dates.groupby(['stayed_date'])[
+        ['adults', 'children', 'babies']].sum().reset_index()
+
+    df_total_guests['total_guests_per_day'] = \
+        df_total_guests['adults'] + \
+        df_total_guests['babies'] + \
+        df_total_guests['children']
+
+    return df_total_guests.loc[df_total_guests['stayed_date']
+        .between(selected_date,
+                 (selected_date + pd.to_timedelta(time_span, unit='days')))] \
+        .reset_index(drop=True)
+
+
+def main():
+    selected_date = '2016-08-01'
+    time_span = 7
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in [10000, 100000, 1000000]:
+            csv_file_path = os.path.join(tmp_dir, 'bookings.csv')
+            # Save with index, like the prepared raw data file
+            generate_bookings(n_rows).to_csv(csv_file_path)
+
+            df_active_bookings = analyse.get_active_bookings(csv_file_path,
+                                                             selected_date,
+                                                             time_span)
+
+            expected = date_range_total_guests(df_active_bookings,
+                                               selected_date, time_span)
+            result = occupancy.calculate_total_guests(df_active_bookings,
+                                                      selected_date, time_span)
+            assert expected.to_csv(index=False) == result.to_csv(index=False)
+
+            time_date_range = min(timeit.repeat(
+                lambda: date_range_total_guests(df_active_bookings,
+                                                selected_date, time_span),
+                number=1, repeat=3))
+            time_vectorized = min(timeit.repeat(
+                lambda: occupancy.calculate_total_guests(df_active_bookings,
+                                                         selected_date,
+                                                         time_span),
+                number=1, repeat=3))
+
+            print('%9d rows, %7d active: date range %8.4f s, '
+                  'vectorized %8.4f s, speed up %6.1fx'
+                  % (n_rows, len(df_active_bookings), time_date_range,
+                     time_vectorized, time_date_range / time_vectorized))
+
+
+if __name__ == '__main__':
+    main()
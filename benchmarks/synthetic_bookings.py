@@ -0,0 +1,158 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Generate synthetic hotel bookings"
+
+#######################################################################
+
+import argparse
+import calendar
+import numpy as np
+import pandas as pd
+
+# Share of missing values per column, similar to the hotel bookings export
+NAN_RATES = {'children': 0.00004,
+             'country': 0.004,
+             'agent': 0.137,
+             'company': 0.943}
+
+
+def choice(rng, values, probabilities, n_rows):
+    """
+    Draw values with given probabilities.
+
+    :param rng: numpy random number generator
+    :param values: List of values
+    :param probabilities: List of probabilities, normalized to sum 1
+    :param n_rows: Number of values
+    :return: numpy array of values
+    """
+
+    probabilities = np.asarray(probabilities, dtype=float)
+
+    return rng.choice(values, n_rows, p=probabilities / probabilities.sum())
+
+
+def generate_bookings(n_rows, seed=0):
+    """
+    Generate a data frame of random hotel bookings with the columns of the
+    hotel bookings export and similar distributions and missing values.
+
+    :param n_rows: Number of bookings
+    :param seed: Seed of random number generator
+    :return: pandas data frame with hotel booking columns
+    """
+
+    rng = np.random.default_rng(seed)
+
+    arrival = pd.to_datetime('2015-07-01') + pd.to_timedelta(
+        rng.integers(0, 793, n_rows), unit='D')
+    lead_time = np.minimum(rng.exponential(104, n_rows).astype(int), 737)
+    stays_in_weekend_nights = np.minimum(rng.poisson(0.9, n_rows), 19)
+    stays_in_week_nights = np.minimum(rng.poisson(2.5, n_rows), 50)
+    leaving = arrival + pd.to_timedelta(
+        stays_in_weekend_nights + stays_in_week_nights, unit='D')
+
+    is_canceled = rng.binomial(1, 0.37, n_rows)
+    reserved_room_type = choice(rng, list('ADEFGBCH'),
+                                [72, 16, 5, 2, 2, 1, 1, 1], n_rows)
+
+    df = pd.DataFrame({
+        'hotel': choice(rng, ['City Hotel', 'Resort Hotel'], [66, 34],
+                        n_rows),
+        'is_canceled': is_canceled,
+        'lead_time': lead_time,
+        'arrival_date_year': arrival.year,
+        'arrival_date_month': np.array(calendar.month_name)[arrival.month],
+        'arrival_date_week_number': arrival.isocalendar().week.to_numpy(),
+        'arrival_date_day_of_month': arrival.day,
+        'stays_in_weekend_nights': stays_in_weekend_nights,
+        'stays_in_week_nights': stays_in_week_nights,
+        'adults': choice(rng, [1, 2, 3, 0], [19, 75, 5, 1], n_rows),
+        'children': choice(rng, [0, 1, 2], [93, 4, 3], n_rows).astype(float),
+        'babies': choice(rng, [0, 1], [992, 8], n_rows),
+        'meal': choice(rng, ['BB', 'HB', 'SC', 'Undefined', 'FB'],
+                       [77, 12, 9, 1, 1], n_rows),
+        'country': choice(rng, ['PRT', 'GBR', 'FRA', 'ESP', 'DEU', 'ITA',
+                                'IRL', 'BEL', 'BRA', 'NLD', 'USA', 'CHE'],
+                          [41, 10, 9, 7, 6, 3, 3, 2, 2, 2, 2, 2], n_rows),
+        'market_segment': choice(rng, ['Online TA', 'Offline TA/TO',
+                                       'Groups', 'Direct', 'Corporate',
+                                       'Complementary', 'Aviation'],
+                                 [47, 20, 17, 11, 4, 0.6, 0.2], n_rows),
+        'distribution_channel': choice(rng, ['TA/TO', 'Direct', 'Corporate',
+                                             'GDS'],
+                                       [82, 12, 5.6, 0.2], n_rows),
+        'is_repeated_guest': rng.binomial(1, 0.03, n_rows),
+        'previous_cancellations': rng.binomial(1, 0.05, n_rows),
+        'previous_bookings_not_canceled': rng.binomial(1, 0.03, n_rows),
+        'reserved_room_type': reserved_room_type,
+        'assigned_room_type': np.where(
+            rng.random(n_rows) < 0.88, reserved_room_type,
+            choice(rng, list('ADEFGBCHIK'), [62, 21, 7, 3, 2, 2, 2, 1, 0.3,
+                                             0.2], n_rows)),
+        'booking_changes': np.minimum(rng.poisson(0.2, n_rows), 21),
+        'deposit_type': choice(rng, ['No Deposit', 'Non Refund',
+                                     'Refundable'], [87.6, 12.2, 0.2],
+                               n_rows),
+        'agent': rng.integers(1, 536, n_rows).astype(float),
+        'company': rng.integers(6, 544, n_rows).astype(float),
+        'days_in_waiting_list': np.where(rng.random(n_rows) < 0.97, 0,
+                                         rng.integers(1, 392, n_rows)),
+        'customer_type': choice(rng, ['Transient', 'Transient-Party',
+                                      'Contract', 'Group'],
+                                [75, 21, 3.4, 0.6], n_rows),
+        'adr': rng.gamma(4.0, 25.5, n_rows).round(2),
+        'required_car_parking_spaces': rng.binomial(1, 0.06, n_rows),
+        'total_of_special_requests': np.minimum(rng.poisson(0.57, n_rows),
+                                                5),
+        'reservation_status': np.where(
+            is_canceled == 1,
+            choice(rng, ['Canceled', 'No-Show'], [97, 3], n_rows),
+            'Check-Out'),
+        'reservation_status_date': np.where(
+            is_canceled == 1,
+            (arrival - pd.to_timedelta(
+                (rng.random(n_rows) * lead_time).astype(int), unit='D'))
+            .strftime('%Y-%m-%d'),
+            leaving.strftime('%Y-%m-%d')),
+    })
+
+    # Add missing values
+    for column, nan_rate in NAN_RATES.items():
+        df.loc[rng.random(n_rows) < nan_rate, column] = np.nan
+
+    return df
+
+
+def write_bookings(csv_file_path, n_rows, seed=0, chunk_size=1000000):
+    """
+    Generate random hotel bookings and save them as csv file.
+    Bookings are generated chunk by chunk, so large files can be
+    written with bounded memory.
+
+    :param csv_file_path: Path of csv file
+    :param n_rows: Number of bookings
+    :param seed: Seed of random number generator
+    :param chunk_size: Number of bookings generated at once
+    """
+
+    for i, start in enumerate(range(0, n_rows, chunk_size)):
+        generate_bookings(min(chunk_size, n_rows - start), seed + i) \
+            .to_csv(csv_file_path, index=False, header=i == 0,
+                    mode='w' if i == 0 else 'a')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate csv file of random hotel bookings.')
+    parser.add_argument('n_rows', type=int, help='Number of bookings')
+    parser.add_argument('csv_path', help='Path of csv file')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of random number generator')
+    args = parser.parse_args()
+
+    write_bookings(args.csv_path, args.n_rows, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+from hotel_booking_app.view.cli import main
+
+main()
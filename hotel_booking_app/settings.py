@@ -9,9 +9,47 @@ ROOT_DIR = Path(__file__).parent.parent
 # Path of directory where csv files are saved to
 RAW_DATA_PATH = os.path.join(ROOT_DIR, 'data/raw')
 RESULT_DATA_PATH = os.path.join(ROOT_DIR, 'data/results')
+CACHE_DATA_PATH = os.path.join(ROOT_DIR, 'data/cache')
+INCREMENTAL_DATA_PATH = os.path.join(ROOT_DIR, 'data/incremental')
+CUBE_DATA_PATH = os.path.join(ROOT_DIR, 'data/cube')
+
+# Maximum size of cache directory (in bytes)
+CACHE_SIZE_LIMIT = 1024 ** 3
+
+# Number of rows read at once when csv files are analysed in chunks
+CHUNK_SIZE = 100000
+
+# Number of bookings sampled for estimating total guests in a preview
+# and confidence level of the estimates
+PREVIEW_SAMPLE_SIZE = 20000
+PREVIEW_CONFIDENCE = 0.95
+
+# Path of JSON lines file, to which the application appends metrics of
+# every processing step, or None to not save metrics
+METRICS_FILE_PATH = None
+
+# Columns identifying a booking in incremental updates, or None to use
+# booking keys hashed from the columns, which do not change
+BOOKING_KEY_COLUMNS = None
+
+# Maximum number of changed bookings relative to all stored bookings,
+# before the incremental store saves a new snapshot
+INCREMENTAL_COMPACT_RATIO = 0.25
+
+# Columns hashed to identify duplicated bookings, or None to use all columns
+BOOKING_IDENTITY_COLUMNS = None
 
 # Name of processed csv files
 RAW_NAME = 'hotel_data_raw.csv'
+RAW_NAME_PER_HOTEL = 'hotel_data_raw_%s.csv'
 RESULT_ACTIVE_BOOKINGS = 'hotel_active_bookings.csv'
 RESULT_TOTAL_GUESTS = 'hotel_total_guests.csv'
+RESULT_TOTAL_GUESTS_PREVIEW = 'hotel_total_guests_preview.csv'
+RESULT_TOTAL_GUESTS_FORECAST = 'hotel_total_guests_forecast.csv'
+RESULT_TOTAL_GUESTS_PER_DATE = 'hotel_total_guests_%s.csv'
+RESULT_DAILY_MEASURES = 'hotel_daily_measures.csv'
+RESULT_OCCUPANCY_CHANGES = 'hotel_occupancy_changes.csv'
+RESULT_DUPLICATE_BOOKINGS = 'hotel_duplicate_bookings.csv'
+RESULT_ACTIVE_BOOKINGS_PER_HOTEL = 'hotel_active_bookings_hotel_%s.csv'
+RESULT_TOTAL_GUESTS_PER_HOTEL = 'hotel_total_guests_hotel_%s.csv'
 
@@ -0,0 +1,121 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Export results in the background"
+
+#######################################################################
+
+import os.path
+from concurrent.futures import ThreadPoolExecutor
+from hotel_booking_app.src.instrumentation import step
+
+# Formats results can be exported to, compressed csv files are detected
+# by their file extension
+FORMATS = ['csv', 'csv.gz', 'csv.bz2', 'csv.zip', 'parquet']
+
+
+def get_export_path(file_path, export_format):
+    """
+    Replace format of result file name, e.g. 'results.csv' to
+    'results.parquet'.
+
+    :param file_path: Path of result file ending with .csv
+    :param export_format: One of FORMATS
+    :return: Path of result file in export format
+    """
+
+    if export_format not in FORMATS:
+        raise ValueError('Unknown export format: %s' % export_format)
+
+    root, extension = os.path.splitext(file_path)
+
+    return (root if extension == '.csv' else file_path) + '.' + export_format
+
+
+def write_result(df, file_path):
+    """
+    Save result data frame as csv or parquet file, depending on the file
+    extension. Parquet requires pyarrow or fastparquet to be installed.
+
+    :param df: pandas data frame containing result
+    :param file_path: Path of result file
+    """
+
+    if file_path.endswith('.parquet'):
+        df.to_parquet(file_path, index=False)
+    else:
+        # Compression is inferred from the file extension
+        df.to_csv(file_path, index=False)
+
+
+class ResultExporter:
+    """
+    Class that saves results in a background thread, so results can be
+    used while they are written. Results are written one after another
+    in the order they were submitted.
+    """
+
+    def __init__(self, instrumentation=None):
+        """
+        Initialize class ResultExporter
+
+        :param instrumentation: Instrumentation measuring every export
+                                (optional)
+        """
+        self.instrumentation = instrumentation
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures = []
+
+    def submit(self, df, file_path, step_name='export'):
+        """
+        Save result in the background.
+
+        :param df: pandas data frame containing result, which must not be
+                   changed afterwards
+        :param file_path: Path of result file
+        :param step_name: Name of measured step
+        :return: concurrent.futures.Future of export
+        """
+
+        future = self.executor.submit(self.export, df, file_path, step_name)
+        self.futures.append(future)
+
+        return future
+
+    def export(self, df, file_path, step_name):
+        """
+        Save result and measure it.
+
+        :param df: pandas data frame containing result
+        :param file_path: Path of result file
+        :param step_name: Name of measured step
+        """
+
+        with step(self.instrumentation, step_name, df.shape[0]):
+            write_result(df, file_path)
+
+    def wait(self):
+        """
+        Wait until all submitted results are saved.
+        Errors of exports are raised here.
+        """
+
+        futures, self.futures = self.futures, []
+
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """
+        Wait until all submitted results are saved and stop the thread.
+        """
+
+        try:
+            self.wait()
+        finally:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
@@ -0,0 +1,252 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Measure duration, rows and memory of processing steps"
+
+#######################################################################
+
+import json
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # resource is not available on Windows
+    resource = None
+
+
+class Instrumentation:
+    """
+    Class that records metrics of processing steps.
+    For every step the duration, the number of rows going in and out and
+    the peak memory are recorded. Every record is appended to a JSON lines
+    file (optional) and passed to all callbacks.
+
+    Peak memory is the maximum traced memory of the step and only recorded,
+    if memory tracing is enabled, because tracing slows down processing.
+    The maximum resident set size of the process is recorded, if the
+    platform provides it.
+
+    Steps can be measured in several threads, e.g. while results are saved
+    in the background. Open steps are kept per thread. Traced memory
+    belongs to the whole process, so the peak of a step may include memory
+    of steps running at the same time in other threads.
+    """
+
+    def __init__(self, metrics_file_path=None, callbacks=None,
+                 trace_memory=False):
+        """
+        Initialize class Instrumentation
+
+        :param metrics_file_path: Path of JSON lines file, to which
+                                  records are appended (optional)
+        :param callbacks: List of functions, which are called with every
+                          record (optional)
+        :param trace_memory: If true, trace peak memory of steps
+        """
+        self.metrics_file_path = metrics_file_path
+        self.callbacks = list(callbacks or [])
+        self.trace_memory = trace_memory
+        self.records = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.n_open_steps = 0
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def step(self, name, rows_in=None):
+        """
+        Create context of a measured step.
+
+        :param name: Name of step
+        :param rows_in: Number of rows going into the step (optional)
+        :return: Step, whose rows_out can be set within the context
+        """
+        return Step(self, name, rows_in)
+
+    @property
+    def open_steps(self):
+        """
+        Open steps of the current thread, the innermost step is last.
+
+        :return: List of steps
+        """
+
+        if not hasattr(self.local, 'open_steps'):
+            self.local.open_steps = []
+
+        return self.local.open_steps
+
+    def open_step(self, open_step):
+        """
+        Start measuring a step in the current thread.
+
+        :param open_step: Step
+        """
+
+        with self.lock:
+            self.update_peaks()
+            self.open_steps.append(open_step)
+            self.n_open_steps += 1
+
+    def close_step(self, open_step):
+        """
+        Stop measuring a step in the current thread.
+
+        :param open_step: Step
+        """
+
+        with self.lock:
+            self.update_peaks()
+            self.open_steps.remove(open_step)
+            self.n_open_steps -= 1
+
+    def update_peaks(self):
+        """
+        Add traced peak memory since the last update to all open steps
+        of the current thread and start a new peak. Steps can therefore be
+        nested. Must be called with the lock held.
+        """
+
+        if not self.trace_memory:
+            return
+
+        peak = tracemalloc.get_traced_memory()[1]
+
+        for open_step in self.open_steps:
+            open_step.peak_memory = max(open_step.peak_memory, peak)
+
+        # Resetting the peak requires Python 3.9, before that the peak
+        # since the start of tracing is recorded. The peak is not reset,
+        # while steps of other threads are open, since they have not
+        # added it yet
+        if hasattr(tracemalloc, 'reset_peak') \
+                and self.n_open_steps == len(self.open_steps):
+            tracemalloc.reset_peak()
+
+    def record(self, record):
+        """
+        Save record of a finished step and pass it to all callbacks.
+
+        :param record: Dictionary of metrics
+        """
+
+        # Records of several threads are written one after another
+        with self.lock:
+            self.records.append(record)
+
+            if self.metrics_file_path:
+                with open(self.metrics_file_path, 'a') as metrics_file:
+                    metrics_file.write(json.dumps(record) + '\n')
+
+        for callback in self.callbacks:
+            callback(record)
+
+    def summary(self):
+        """
+        Create text with duration of every recorded step.
+
+        :return: Text of timing breakdown
+        """
+        return format_summary(self.records)
+
+
+class Step:
+    """
+    Class that represents the context of a measured step.
+    """
+
+    def __init__(self, instrumentation, name, rows_in):
+        """
+        Initialize class Step
+
+        :param instrumentation: Instrumentation recording the step
+        :param name: Name of step
+        :param rows_in: Number of rows going into the step
+        """
+        self.instrumentation = instrumentation
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.peak_memory = 0
+        self.start = None
+
+    def __enter__(self):
+        self.instrumentation.open_step(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        seconds = time.perf_counter() - self.start
+
+        self.instrumentation.close_step(self)
+
+        record = {'step': self.name,
+                  'seconds': round(seconds, 6),
+                  'rows_in': self.rows_in,
+                  'rows_out': self.rows_out,
+                  'failed': exc_type is not None,
+                  'time': time.time()}
+
+        if self.instrumentation.trace_memory:
+            record['peak_memory_mb'] = round(self.peak_memory / 1024 ** 2, 3)
+
+        # Maximum resident set size is given in kilobytes on Linux
+        if resource is not None:
+            record['max_rss_mb'] = round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 3)
+
+        self.instrumentation.record(record)
+
+
+class DisabledStep:
+    """
+    Class that represents the context of a step, which is not measured.
+    It does nothing, so disabled instrumentation has almost no overhead.
+    """
+
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        pass
+
+    def __setattr__(self, name, value):
+        # Ignore rows_out set within the context
+        pass
+
+
+DISABLED_STEP = DisabledStep()
+
+
+def step(instrumentation, name, rows_in=None):
+    """
+    Create context of a step, which is only measured if instrumentation
+    is given.
+
+    :param instrumentation: Instrumentation or None
+    :param name: Name of step
+    :param rows_in: Number of rows going into the step (optional)
+    :return: Step or DisabledStep
+    """
+
+    if instrumentation is None:
+        return DISABLED_STEP
+
+    return instrumentation.step(name, rows_in)
+
+
+def format_summary(records):
+    """
+    Create text with duration of every recorded step.
+
+    :param records: List of records
+    :return: Text of timing breakdown
+    """
+
+    return ' | '.join('%s %.2f s' % (record['step'], record['seconds'])
+                      for record in records)
@@ -0,0 +1,391 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Columnar cache for prepared data"
+
+#######################################################################
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.preparation.schema as schema
+
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'index.json'
+
+# Entries and the index are written to temporary files first, which are
+# renamed when complete. Temporary files older than the timeout were left
+# by interrupted writes (in seconds).
+TEMPORARY_PREFIX = '.tmp_'
+TEMPORARY_TIMEOUT = 3600
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """
+    Calculate hash of file content.
+
+    :param file_path: Path of file
+    :param block_size: Number of bytes read at once
+    :return: Hex digest of file content
+    """
+
+    file_hash_object = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            file_hash_object.update(block)
+
+    return file_hash_object.hexdigest()
+
+
+def write_columns(df, directory_path, **metadata):
+    """
+    Save data frame in a columnar binary layout.
+    Every column is saved as a NumPy file, text columns as integer codes
+    plus their unique values and nullable integer columns as integers plus
+    a mask of missing values. Column names and types are saved in a
+    manifest file.
+
+    :param df: pandas data frame
+    :param directory_path: Path of directory
+    :param metadata: Additional values saved in manifest file
+    """
+
+    os.makedirs(directory_path, exist_ok=True)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        column = {'name': name, 'dtype': str(df[name].dtype)}
+        values = df[name]
+
+        # Save nullable integer columns as integers and mask
+        if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) \
+                and values.dtype.kind in 'iu':
+            np.save(os.path.join(directory_path, '%d_mask.npy' % i),
+                    values.isnull().to_numpy())
+            column['masked'] = True
+            values = values.fillna(0).to_numpy(values.dtype.numpy_dtype)
+
+        # Save categorical columns as their codes and categories
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            column['categories'] = list(values.cat.categories)
+            column['ordered'] = bool(values.cat.ordered)
+            values = values.cat.codes
+
+        # Save text columns as integer codes, missing values as -1
+        elif values.dtype.kind not in 'biufmM':
+            codes, uniques = pd.factorize(values)
+            column['uniques'] = list(uniques)
+            values = codes.astype(np.min_scalar_type(-len(uniques) - 1))
+
+        np.save(os.path.join(directory_path, '%d.npy' % i),
+                np.asarray(values))
+        columns.append(column)
+
+    with open(os.path.join(directory_path, MANIFEST_NAME), 'w') \
+            as manifest_file:
+        json.dump(dict(metadata, columns=columns), manifest_file)
+
+
+def read_columns(directory_path, positions=None):
+    """
+    Load data frame saved in a columnar binary layout.
+    Numeric columns are memory-mapped while loading, so loading some rows
+    only reads these rows.
+
+    :param directory_path: Path of directory
+    :param positions: Integer array of row positions to load, or None to
+                      load all rows
+    :return: pandas data frame
+    """
+
+    with open(os.path.join(directory_path, MANIFEST_NAME)) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    columns = {}
+    for i, column in enumerate(manifest['columns']):
+        values = np.load(os.path.join(directory_path, '%d.npy' % i),
+                         mmap_mode='r')
+
+        if positions is not None:
+            values = values[positions]
+
+        # Restore categorical columns from codes and categories
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(
+                np.asarray(values),
+                dtype=pd.CategoricalDtype(column['categories'],
+                                          column['ordered']))
+
+        # Restore text columns from codes and unique values
+        elif 'uniques' in column:
+            uniques = np.array(column['uniques'] + [np.nan], dtype=object)
+            values = pd.Series(uniques[values], dtype=object)
+
+            if column['dtype'] != 'object':
+                values = values.astype(column['dtype'])
+
+        # Restore nullable integer columns from integers and mask
+        elif column.get('masked'):
+            mask = np.load(os.path.join(directory_path, '%d_mask.npy' % i),
+                           mmap_mode='r')
+            if positions is not None:
+                mask = mask[positions]
+
+            values = pd.Series(pd.arrays.IntegerArray(np.asarray(values),
+                                                      np.asarray(mask)))
+
+        columns[column['name']] = values
+
+    return pd.DataFrame(columns)
+
+
+class DataCache:
+    """
+    Class that caches prepared data frames in a columnar binary layout.
+    Entries are keyed by the content hash of the source file and
+    validated by its size and modification time. Entries and the index
+    are replaced at once, so an interrupted write never leaves a partial
+    entry.
+    """
+
+    def __init__(self, cache_path, size_limit):
+        """
+        Initialize class DataCache
+
+        :param cache_path: Path of cache directory
+        :param size_limit: Maximum size of cache directory (in bytes)
+        """
+        self.cache_path = cache_path
+        self.size_limit = size_limit
+
+    def get(self, source_path, threshold):
+        """
+        Load prepared data of source file from cache.
+
+        :param source_path: Path of source csv file
+        :param threshold: NaN threshold used for preparing the data
+        :return: pandas data frame or None, if there is no valid entry
+        """
+
+        entry_path = os.path.join(self.cache_path,
+                                  self.entry_key(source_path, threshold))
+        manifest_path = os.path.join(entry_path, MANIFEST_NAME)
+
+        if not os.path.isfile(manifest_path):
+            return None
+
+        df = read_columns(entry_path)
+
+        # Mark entry as recently used
+        os.utime(manifest_path)
+
+        return df
+
+    def contains(self, source_path, threshold):
+        """
+        Check if cache contains prepared data of source file, without
+        loading it.
+
+        :param source_path: Path of source csv file
+        :param threshold: NaN threshold used for preparing the data
+        :return: True, if there is a valid entry
+        """
+
+        return os.path.isfile(os.path.join(
+            self.cache_path, self.entry_key(source_path, threshold),
+            MANIFEST_NAME))
+
+    def put(self, source_path, threshold, df):
+        """
+        Save prepared data of source file to cache.
+
+        :param source_path: Path of source csv file
+        :param threshold: NaN threshold used for preparing the data
+        :param df: pandas data frame containing prepared data
+        """
+
+        key = self.entry_key(source_path, threshold)
+        entry_path = os.path.join(self.cache_path, key)
+        manifest_path = os.path.join(entry_path, MANIFEST_NAME)
+
+        # The entry is written to a temporary directory, which is renamed
+        # when it is complete
+        os.makedirs(self.cache_path, exist_ok=True)
+        temporary_path = tempfile.mkdtemp(prefix=TEMPORARY_PREFIX,
+                                          dir=self.cache_path)
+        try:
+            write_columns(df, temporary_path,
+                          source_path=os.path.abspath(source_path))
+
+            if not os.path.isfile(manifest_path):
+                shutil.rmtree(entry_path, ignore_errors=True)
+
+                try:
+                    os.rename(temporary_path, entry_path)
+                except OSError:
+                    # Another process saved the entry in the meantime
+                    if not os.path.isfile(manifest_path):
+                        raise
+        finally:
+            shutil.rmtree(temporary_path, ignore_errors=True)
+
+        self.remove_stale_entries(source_path, key)
+        self.limit_size()
+
+    def entry_key(self, source_path, threshold):
+        """
+        Get key of cache entry for source file.
+        The content hash is only recalculated if size or modification time
+        of the source file changed.
+
+        :param source_path: Path of source csv file
+        :param threshold: NaN threshold used for preparing the data
+        :return: Key of cache entry
+        """
+
+        index = self.load_index()
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+
+        source = index.get(source_path)
+        if not source or source['size'] != stat.st_size \
+                or source['mtime'] != stat.st_mtime_ns:
+            source = {'size': stat.st_size,
+                      'mtime': stat.st_mtime_ns,
+                      'hash': file_hash(source_path)}
+            index[source_path] = source
+            self.save_index(index)
+
+        return '%s_%s_%s' % (source['hash'], threshold,
+                             schema.SCHEMA_VERSION)
+
+    def remove_stale_entries(self, source_path, key):
+        """
+        Remove directories of the cache, which are no valid entries:
+
+        - Entries created from an older version of the source file
+        - Entries of source files, which are not in the index
+        - Entries with an older schema version
+        - Incomplete entries and temporary files of interrupted writes
+
+        :param source_path: Path of source csv file
+        :param key: Key of current cache entry
+        """
+
+        source_path = os.path.abspath(source_path)
+        source_hash = key.split('_')[0]
+        known_hashes = {source['hash']
+                        for source in self.load_index().values()}
+
+        for entry in os.scandir(self.cache_path):
+            if entry.name.startswith(TEMPORARY_PREFIX):
+                is_stale = time.time() - entry.stat().st_mtime \
+                    > TEMPORARY_TIMEOUT
+            elif entry.is_dir():
+                entry_hash = entry.name.split('_')[0]
+                entry_version = entry.name.split('_')[-1]
+                manifest_path = os.path.join(entry.path, MANIFEST_NAME)
+                manifest = {}
+
+                if os.path.isfile(manifest_path):
+                    with open(manifest_path) as manifest_file:
+                        manifest = json.load(manifest_file)
+
+                is_stale = not manifest \
+                    or entry_hash not in known_hashes \
+                    or entry_version != str(schema.SCHEMA_VERSION) \
+                    or manifest.get('source_path') == source_path \
+                    and entry_hash != source_hash
+            else:
+                continue
+
+            if is_stale:
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+
+    def limit_size(self):
+        """
+        Remove least recently used entries until the cache directory
+        is smaller than the size limit.
+        """
+
+        entries = []
+        for entry_key, _ in self.entries():
+            entry_path = os.path.join(self.cache_path, entry_key)
+            size = sum(entry.stat().st_size
+                       for entry in os.scandir(entry_path))
+            last_used = os.stat(
+                os.path.join(entry_path, MANIFEST_NAME)).st_mtime
+            entries.append((last_used, size, entry_path))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.size_limit:
+                break
+
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+
+    def entries(self):
+        """
+        Iterate over all cache entries.
+
+        :return: Generator of entry key and manifest
+        """
+
+        if not os.path.isdir(self.cache_path):
+            return
+
+        for entry in os.scandir(self.cache_path):
+            manifest_path = os.path.join(entry.path, MANIFEST_NAME)
+
+            if entry.is_dir() and os.path.isfile(manifest_path) \
+                    and not entry.name.startswith(TEMPORARY_PREFIX):
+                with open(manifest_path) as manifest_file:
+                    yield entry.name, json.load(manifest_file)
+
+    def load_index(self):
+        """
+        Load index of known source files.
+
+        :return: Dictionary mapping source path to size, time and hash
+        """
+
+        index_path = os.path.join(self.cache_path, INDEX_NAME)
+
+        if not os.path.isfile(index_path):
+            return {}
+
+        with open(index_path) as index_file:
+            return json.load(index_file)
+
+    def save_index(self, index):
+        """
+        Save index of known source files.
+        The index is written to a temporary file, which replaces the
+        previous index at once.
+
+        :param index: Dictionary mapping source path to size, time and hash
+        """
+
+        os.makedirs(self.cache_path, exist_ok=True)
+
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            prefix=TEMPORARY_PREFIX, suffix='.json', dir=self.cache_path)
+        try:
+            with os.fdopen(file_descriptor, 'w') as index_file:
+                json.dump(index, index_file)
+
+            os.replace(temporary_path, os.path.join(self.cache_path,
+                                                    INDEX_NAME))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
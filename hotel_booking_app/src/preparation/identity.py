@@ -0,0 +1,164 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Identify bookings by a 64-bit key"
+
+#######################################################################
+
+import logging
+import numpy as np
+import pandas as pd
+
+KEY_COLUMN = 'booking_key'
+
+# Columns of a booking, which may change after it was booked, e.g. when
+# it is cancelled or a room is assigned. All other columns identify the
+# booking in incremental updates.
+MUTABLE_COLUMNS = ['is_canceled', 'reservation_status',
+                   'reservation_status_date', 'assigned_room_type',
+                   'booking_changes', 'days_in_waiting_list', 'deposit_type',
+                   'customer_type', 'adr', 'required_car_parking_spaces',
+                   'total_of_special_requests', 'agent', 'company']
+
+
+def get_identity_columns(columns):
+    """
+    Get columns identifying a booking across versions of the booking.
+
+    :param columns: Names of columns of bookings
+    :return: List of columns, which are neither mutable nor the key
+    """
+
+    return [column for column in columns
+            if column not in MUTABLE_COLUMNS and column != KEY_COLUMN]
+
+
+def get_booking_keys(df, key_columns=None, numbered=False):
+    """
+    Get a 64-bit key per booking by hashing its key columns.
+    Hashing is vectorized per column and does not depend on the order of
+    rows, so the same booking gets the same key in every file and run.
+    Categories are hashed by value and numbers as floats, so the key does
+    not depend on the column types a file was read with, e.g. int16 or
+    nullable Int16.
+
+    Numbered keys also hash the occurrence of equal bookings within the
+    data frame, so bookings with equal key columns get distinct keys, e.g.
+    to store them separately. The n-th occurrence in one file gets the same
+    key as the n-th occurrence in another file.
+
+    :param df: pandas data frame containing bookings
+    :param key_columns: Names of columns identifying a booking, or None
+                        to use all columns except the key column
+    :param numbered: If true, number equal bookings
+    :return: pandas Series of uint64 keys with the index of df
+    """
+
+    if key_columns is None:
+        key_columns = [column for column in df.columns
+                       if column != KEY_COLUMN]
+
+    missing_columns = set(key_columns) - set(df.columns)
+    if missing_columns:
+        raise ValueError('Bookings miss key columns: %s'
+                         % ', '.join(sorted(missing_columns)))
+
+    df_key = df[list(key_columns)].copy()
+
+    for column in df_key.columns:
+        if df_key[column].dtype.kind in 'biuf':
+            df_key[column] = df_key[column].to_numpy(dtype=np.float64,
+                                                     na_value=np.nan)
+
+    keys = pd.util.hash_pandas_object(df_key, index=False)
+
+    # Hash keys together with number of their occurrence
+    if numbered:
+        keys = pd.util.hash_pandas_object(pd.DataFrame({
+            'key': keys,
+            'occurrence': keys.groupby(keys).cumcount()}), index=False)
+
+    return keys.rename(KEY_COLUMN)
+
+
+def add_booking_keys(df, key_columns=None, numbered=False):
+    """
+    Add key column to bookings, e.g. to join them with other results.
+
+    :param df: pandas data frame containing bookings
+    :param key_columns: Names of columns identifying a booking, or None
+                        to use all columns
+    :param numbered: If true, number equal bookings
+    :return: pandas data frame with key as first column
+    """
+
+    keys = get_booking_keys(df, key_columns, numbered)
+
+    df = df.drop(columns=KEY_COLUMN, errors='ignore')
+    df.insert(0, KEY_COLUMN, keys)
+
+    return df
+
+
+def find_duplicates(df, key_columns=None, known_keys=None):
+    """
+    Find bookings with the same key as another booking or as a known
+    booking, e.g. from a file uploaded before.
+
+    :param df: pandas data frame containing bookings
+    :param key_columns: Names of columns identifying a booking, or None
+                        to use all columns
+    :param known_keys: Array of keys of known bookings (optional)
+    :return: pandas data frame of duplicated bookings with their key,
+             number of occurrences and whether they are known, sorted
+             by key
+    """
+
+    df = add_booking_keys(df, key_columns)
+    keys = df[KEY_COLUMN]
+
+    df.insert(1, 'occurrences', keys.map(keys.value_counts()).to_numpy())
+    df.insert(2, 'known', get_known(keys, known_keys))
+
+    df_duplicates = df.loc[((df['occurrences'] > 1) | df['known'])
+                           .to_numpy()]
+
+    # Report number of duplicates
+    if len(df_duplicates):
+        logging.warning('%d bookings occur more than once or are known '
+                        '(%d distinct)', len(df_duplicates),
+                        df_duplicates[KEY_COLUMN].nunique())
+
+    return df_duplicates.sort_values(KEY_COLUMN, kind='mergesort')
+
+
+def get_known(keys, known_keys=None):
+    """
+    Check which keys are known.
+
+    :param keys: pandas Series of keys
+    :param known_keys: Array of keys of known bookings (optional)
+    :return: numpy array, true for known keys
+    """
+
+    if known_keys is None:
+        return np.zeros(len(keys), dtype=bool)
+
+    return np.isin(keys.to_numpy(), np.asarray(known_keys, dtype=np.uint64))
+
+
+def deduplicate(df, key_columns=None, known_keys=None):
+    """
+    Remove duplicated bookings, keeping the first occurrence, and
+    bookings that are already known, e.g. from a file uploaded before.
+
+    :param df: pandas data frame containing bookings
+    :param key_columns: Names of columns identifying a booking, or None
+                        to use all columns
+    :param known_keys: Array of keys of known bookings (optional)
+    :return: pandas data frame of new unique bookings
+    """
+
+    keys = get_booking_keys(df, key_columns)
+    is_new = ~keys.duplicated().to_numpy() & ~get_known(keys, known_keys)
+
+    return df.loc[is_new]
@@ -3,23 +3,145 @@ __author__ = "Miriam Aydt"
 __program__ = "Prepare data for further analysis"
 #######################################################################
 
+import numpy as np
 import pandas as pd
+import hotel_booking_app.src.preparation.schema as schema
+import hotel_booking_app.src.processing.occupancy_cube as occupancy_cube
+from hotel_booking_app.src.instrumentation import step
 
 
-def import_clean_data(csv_file_path, csv_file_save_to_path, threshold):
+def import_clean_data(csv_file_path, csv_file_save_to_path, threshold,
+                      cache=None, instrumentation=None,
+                      cube_save_to_path=None):
     """
     Import, clean and save csv file.
+    If a cache is given and already contains the prepared data of the csv
+    file, importing and cleaning is skipped, but the cleaned data is still
+    saved to the result csv file.
+    Optionally the daily occupancy cube of the prepared data is saved.
 
     :param csv_file_path: Path of csv file containing relevant data
-    :param csv_file_save_to_path: Path of result csv file
+    :param csv_file_save_to_path: Path of result csv file, or None to not
+                                  save the cleaned data
     :param threshold: Decimal value, representing the maximum NaN percentage
                       of a row. If a row has more NaN values than the threshold,
                       it will be dropped.
+    :param cache: DataCache for prepared data (optional)
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :param cube_save_to_path: Path of cube directory (optional)
+    :return: pandas data frame containing cleaned data
     """
 
-    df = pd.read_csv(csv_file_path)
+    df = None
+
+    if cache is not None:
+        with step(instrumentation, 'read_cache') as measured:
+            df = cache.get(csv_file_path, threshold)
+            measured.rows_out = None if df is None else df.shape[0]
+
+    if df is None:
+        df = read_clean_data(csv_file_path, csv_file_save_to_path, threshold,
+                             cache, instrumentation)
+    elif csv_file_save_to_path is not None:
+        with step(instrumentation, 'write_raw_csv', df.shape[0]):
+            df.to_csv(csv_file_save_to_path, index=False)
+
+    if cube_save_to_path is not None:
+        with step(instrumentation, 'write_cube', df.shape[0]) as measured:
+            df_cube = occupancy_cube.build_cube(df)
+            occupancy_cube.write_cube(df_cube, cube_save_to_path)
+            measured.rows_out = df_cube.shape[0]
+
+    return df
+
+
+def read_clean_data(csv_file_path, csv_file_save_to_path, threshold,
+                    cache=None, instrumentation=None):
+    """
+    Import, clean and save csv file without looking it up in the cache.
+
+    :param csv_file_path: Path of csv file containing relevant data
+    :param csv_file_save_to_path: Path of result csv file, or None to not
+                                  save the cleaned data
+    :param threshold: Maximum NaN percentage of a column
+    :param cache: DataCache, to which prepared data is saved (optional)
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :return: pandas data frame containing cleaned data
+    """
+
+    with step(instrumentation, 'read_csv') as measured:
+        df = schema.convert_types(pd.read_csv(csv_file_path,
+                                              **schema.read_options()))
+        measured.rows_out = df.shape[0]
+
+    # Drop all rows, that have more than threshold*100 percent NaN values
+    with step(instrumentation, 'drop_nan_columns', df.shape[0]) as measured:
+        df = df.loc[:, df.isnull().sum() < threshold*df.shape[0]]
+        measured.rows_out = df.shape[0]
+
+    if csv_file_save_to_path is not None:
+        with step(instrumentation, 'write_raw_csv', df.shape[0]):
+            df.to_csv(csv_file_save_to_path, index=False)
+
+    if cache is not None:
+        with step(instrumentation, 'write_cache', df.shape[0]):
+            cache.put(csv_file_path, threshold, df)
+
+    return df
+
+
+def read_clean_data_in_chunks(csv_file_path, threshold, chunk_size):
+    """
+    Import and clean csv file chunk by chunk.
+    A first pass counts NaN values and determines column types.
+    A second pass yields the cleaned chunks. Only one chunk is held in
+    memory at a time. Columns of the booking schema are read with its
+    compact types.
+
+    :param csv_file_path: Path of csv file containing relevant data
+    :param threshold: Decimal value, representing the maximum NaN percentage
+                      of a row. If a row has more NaN values than the threshold,
+                      it will be dropped.
+    :param chunk_size: Number of rows per chunk
+    :return: Generator of pandas data frames containing cleaned data
+    """
+
+    n_rows = 0
+    null_counts = None
+    dtypes = {}
+
+    for df in pd.read_csv(csv_file_path, chunksize=chunk_size,
+                          **schema.read_options()):
+        n_rows += df.shape[0]
+
+        if null_counts is None:
+            null_counts = df.isnull().sum()
+        else:
+            null_counts += df.isnull().sum()
+
+        # Use a common numeric type for every chunk, e.g. a column with
+        # NaN values in one chunk only must be float in all chunks
+        for column, dtype in df.dtypes.items():
+            if column in schema.BOOKING_DTYPES:
+                continue
+
+            if dtype.kind not in 'biuf' or dtypes.get(column, dtype) is None:
+                dtypes[column] = None
+            else:
+                dtypes[column] = np.result_type(dtypes.get(column, dtype),
+                                                dtype)
+
+    if null_counts is None:
+        return
 
     # Drop all rows, that have more than threshold*100 percent NaN values
-    df = df.loc[:, df.isnull().sum() < threshold*df.shape[0]]
+    columns = null_counts.index[null_counts < threshold*n_rows]
+
+    # Columns of the schema keep its types
+    dtypes = {column: dtype for column, dtype in dtypes.items()
+              if dtype is not None}
+    dtypes.update(schema.read_options()['dtype'])
 
-    df.to_csv(csv_file_save_to_path)
+    for df in pd.read_csv(csv_file_path, chunksize=chunk_size,
+                          usecols=list(columns), dtype=dtypes):
+        yield schema.convert_types(df)
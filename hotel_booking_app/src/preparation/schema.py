@@ -0,0 +1,173 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Compact column types of hotel booking data"
+
+#######################################################################
+
+import calendar
+import numpy as np
+import pandas as pd
+
+# Version of column types, part of the key of cached data
+SCHEMA_VERSION = 1
+
+# Month names in calendar order, so that sorting by month is meaningful
+MONTHS = pd.CategoricalDtype(list(calendar.month_name)[1:], ordered=True)
+
+# Column types of the hotel bookings export.
+# Text columns with few distinct values are stored as categories.
+# Flags are stored as int8, counts of guests, nights and days as int16,
+# which holds every realistic value. Values are read at full width and
+# checked before they are converted, as pandas does not check for
+# overflow. Columns with missing values are stored as nullable integers.
+BOOKING_DTYPES = {
+    'hotel': 'category',
+    'is_canceled': 'int8',
+    'lead_time': 'int16',
+    'arrival_date_year': 'int16',
+    'arrival_date_month': MONTHS,
+    'arrival_date_week_number': 'int8',
+    'arrival_date_day_of_month': 'int8',
+    'stays_in_weekend_nights': 'int16',
+    'stays_in_week_nights': 'int16',
+    'adults': 'int16',
+    'children': 'Int16',
+    'babies': 'int16',
+    'meal': 'category',
+    'country': 'category',
+    'market_segment': 'category',
+    'distribution_channel': 'category',
+    'is_repeated_guest': 'int8',
+    'previous_cancellations': 'int16',
+    'previous_bookings_not_canceled': 'int16',
+    'reserved_room_type': 'category',
+    'assigned_room_type': 'category',
+    'booking_changes': 'int16',
+    'deposit_type': 'category',
+    'agent': 'Int16',
+    'company': 'Int16',
+    'days_in_waiting_list': 'int16',
+    'customer_type': 'category',
+    'adr': 'float64',
+    'required_car_parking_spaces': 'int16',
+    'total_of_special_requests': 'int16',
+    'reservation_status': 'category',
+    'reservation_status_date': 'category'}
+
+# Columns needed to calculate total guests per day
+OCCUPANCY_COLUMNS = ['is_canceled', 'arrival_date_year', 'arrival_date_month',
+                     'arrival_date_day_of_month', 'stays_in_weekend_nights',
+                     'stays_in_week_nights', 'adults', 'children', 'babies']
+
+
+def get_nullable_dtypes(nullable=False):
+    """
+    Get nullable integer columns of the schema.
+
+    :param nullable: If true, get all integer columns as nullable integers
+    :return: Dictionary of column and nullable integer type
+    """
+
+    return {column: dtype.capitalize() for column, dtype in
+            BOOKING_DTYPES.items()
+            if isinstance(dtype, str) and (dtype.startswith('Int')
+                                           or nullable and 'int' in dtype)}
+
+
+def get_dtypes(nullable=False):
+    """
+    Get compact column types of the schema.
+
+    :param nullable: If true, get all integer columns as nullable integers
+    :return: Dictionary of column and type
+    """
+
+    dtypes = dict(BOOKING_DTYPES)
+    dtypes.update(get_nullable_dtypes(nullable))
+
+    return dtypes
+
+
+def read_options(columns=None, nullable=False):
+    """
+    Get options of pandas.read_csv for reading hotel bookings, which are
+    converted to compact column types with convert_types afterwards.
+    Columns of the file, which are not part of the schema, are read with
+    the types pandas infers.
+    Integer columns are read as int64 and nullable integer columns as
+    floats, which is faster, so values too large for the compact types
+    are detected instead of wrapping around. Months are read as plain
+    categories, so unknown month names are kept.
+
+    :param columns: List of columns to read, or None to read all columns
+    :param nullable: If true, read all integer columns as nullable integers,
+                     e.g. for delta files with missing values
+    :return: Dictionary of keyword arguments of pandas.read_csv
+    """
+
+    options = {'dtype': {}}
+
+    for column, dtype in get_dtypes(nullable).items():
+        if not isinstance(dtype, str):
+            options['dtype'][column] = 'category'
+        elif dtype.startswith('Int'):
+            options['dtype'][column] = 'float64'
+        elif dtype.startswith('int'):
+            options['dtype'][column] = 'int64'
+        else:
+            options['dtype'][column] = dtype
+
+    # A function instead of a list does not fail for missing columns
+    if columns is not None:
+        columns = set(columns)
+        options['usecols'] = lambda column: column in columns
+
+    return options
+
+
+def check_values(values, column, dtype):
+    """
+    Check that values of a column fit into its compact type.
+
+    :param values: pandas Series read with read_options
+    :param column: Name of column
+    :param dtype: Compact type of column
+    :raises ValueError: If a value is out of range of an integer type or
+                        not a category of a categorical type
+    """
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        unknown_values = pd.Index(values.dropna().unique()) \
+            .difference(dtype.categories)
+
+        if len(unknown_values):
+            raise ValueError('Column %s has unknown values: %s'
+                             % (column, ', '.join(map(str, unknown_values))))
+
+    elif 'int' in dtype.lower() and values.notnull().any():
+        limits = np.iinfo(dtype.lower())
+
+        if values.min() < limits.min or values.max() > limits.max:
+            raise ValueError('Column %s has values out of range of %s '
+                             '(%d to %d): %s to %s'
+                             % (column, dtype, limits.min, limits.max,
+                                values.min(), values.max()))
+
+
+def convert_types(df, nullable=False):
+    """
+    Convert columns read with read_options to compact column types.
+
+    :param df: pandas data frame read with read_options
+    :param nullable: Value of nullable used for read_options
+    :return: pandas data frame with compact column types
+    :raises ValueError: If values do not fit into the compact types
+    """
+
+    dtypes = {column: dtype for column, dtype in
+              get_dtypes(nullable).items() if column in df.columns}
+
+    for column, dtype in dtypes.items():
+        check_values(df[column], column, dtype)
+
+    return df.astype(dtypes)
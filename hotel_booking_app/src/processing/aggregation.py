@@ -0,0 +1,157 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Aggregate several daily measures in one pass"
+
+#######################################################################
+
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.processing.occupancy as occupancy
+
+# Measures and the days, on which a booking counts:
+#   - 'stay': every day from arrival up to and including leaving, as for
+#             total guests
+#   - 'night': every night from arrival up to the day before leaving
+#   - 'arrival', 'departure': day of arrival or leaving
+# and the values of a booking: None counts the booking, a column its
+# values and a list of columns the sum of their values.
+MEASURES = {'stays': ('stay', None),
+            'adults': ('stay', 'adults'),
+            'children': ('stay', 'children'),
+            'babies': ('stay', 'babies'),
+            'total_guests': ('stay', occupancy.GUEST_COLUMNS),
+            'room_nights': ('night', None),
+            'revenue': ('night', 'adr'),
+            'arrivals': ('arrival', None),
+            'departures': ('departure', None)}
+
+# Measures with decimal values, which are summed in cents
+DECIMAL_MEASURES = ['revenue']
+
+
+def get_values(df_bookings, values, scale=1):
+    """
+    Get values of bookings for a measure as integers.
+
+    :param df_bookings: pandas data frame containing bookings
+    :param values: None, name of column or list of names of columns
+    :param scale: Factor of values, e.g. 100 to get cents
+    :return: numpy int64 array of values
+    """
+
+    if values is None:
+        return np.full(len(df_bookings), scale, dtype=np.int64)
+
+    if isinstance(values, list):
+        return sum(get_values(df_bookings, column, scale)
+                   for column in values)
+
+    return np.round(df_bookings[values].fillna(0).to_numpy()
+                    .astype(np.float64) * scale).astype(np.int64)
+
+
+def get_groups(df_bookings, dimensions):
+    """
+    Get group of every booking by the values of the dimension columns.
+
+    :param df_bookings: pandas data frame containing bookings
+    :param dimensions: List of dimension columns
+    :return: Tuple of numpy array of group numbers and pandas data frame
+             with the dimension values of every group
+    """
+
+    if not dimensions:
+        return np.zeros(len(df_bookings), dtype=np.int64), \
+            pd.DataFrame(index=[0])
+
+    grouped = df_bookings.groupby(dimensions, observed=True, dropna=False)
+
+    return grouped.ngroup().to_numpy(), \
+        grouped.size().index.to_frame(index=False)
+
+
+def aggregate_daily(df_bookings, selected_date, time_span, measures=None,
+                    dimensions=None):
+    """
+    Calculate several measures per day and dimension values within a time
+    span in one pass over the bookings.
+
+    The bookings are the non-cancelled bookings leaving on or after the
+    selected date and arriving up to the last day of the time span, i.e.
+    the active bookings of the day before with the time span extended by
+    one day. Bookings leaving on the selected date are not active on it,
+    so they only count as departures, like for total guests.
+
+    Days of all groups are put one after another into one day index, so
+    every measure is summed with one difference array, whatever the
+    number of groups. Only days on which at least one booking of the
+    group stays or leaves are part of the result.
+
+    :param df_bookings: Data frame containing bookings with arrival_day,
+                        leaving_day and the columns of the measures and
+                        dimensions
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span, in which guests should arrive (in days)
+    :param measures: List of names of MEASURES, by default all measures
+    :param dimensions: List of dimension columns, e.g. hotel (optional)
+    :return: pandas data frame with stayed date, dimensions and measures
+    """
+
+    measures = list(MEASURES) if measures is None else list(measures)
+    dimensions = list(dimensions or [])
+
+    unknown_measures = set(measures) - set(MEASURES)
+    if unknown_measures:
+        raise ValueError('Unknown measures: %s'
+                         % ', '.join(sorted(unknown_measures)))
+
+    first_day = occupancy.to_day_numbers([pd.to_datetime(selected_date)])[0]
+    last_day = first_day + int(time_span)
+    n_days = last_day - first_day + 1
+
+    groups, df_groups = get_groups(df_bookings, dimensions)
+    size = len(df_groups) * n_days
+
+    # Day positions of bookings in the day index, clipped to the time span
+    offsets = groups * n_days - first_day
+    arrival_days = df_bookings['arrival_day'].to_numpy().astype(np.int64)
+    leaving_days = df_bookings['leaving_day'].to_numpy().astype(np.int64)
+    start = np.maximum(arrival_days, first_day) + offsets
+    ranges = {'stay': np.minimum(leaving_days, last_day) + offsets,
+              'night': np.minimum(leaving_days - 1, last_day) + offsets}
+    events = {'arrival': arrival_days, 'departure': leaving_days}
+    is_active = leaving_days > first_day
+
+    sums = {}
+    for measure in set(measures) | {'stays', 'departures'}:
+        kind, columns = MEASURES[measure]
+        values = get_values(df_bookings, columns,
+                            100 if measure in DECIMAL_MEASURES else 1)
+
+        if kind in ranges:
+            end = ranges[kind]
+            in_window = is_active & (start <= end)
+            sums[measure] = occupancy.sum_per_day(
+                start[in_window], end[in_window], values[in_window], size)
+        else:
+            days = events[kind]
+            in_window = (days >= first_day) & (days <= last_day)
+            sums[measure] = np.bincount(
+                (days + offsets)[in_window], values[in_window],
+                minlength=size).round().astype(np.int64)
+
+    # Keep days with at least one booking, sorted by day and group
+    positions = np.flatnonzero(sums['stays'] + sums['departures'] > 0)
+    positions = positions[np.argsort(positions % n_days, kind='mergesort')]
+
+    df_daily = df_groups.iloc[positions // n_days].reset_index(drop=True)
+    df_daily.insert(0, 'stayed_date', pd.to_datetime(
+        (positions % n_days + first_day).astype('datetime64[D]')))
+
+    for measure in measures:
+        if measure in DECIMAL_MEASURES:
+            df_daily[measure] = sums[measure][positions] / 100
+        else:
+            df_daily[measure] = sums[measure][positions]
+
+    return df_daily
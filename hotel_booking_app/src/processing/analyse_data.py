@@ -4,172 +4,258 @@ __program__ = "Analyse hotel bookings"
 
 #######################################################################
 
+import os.path
+import numpy as np
 import pandas as pd
-import datetime as dt
+import hotel_booking_app.src.processing.occupancy as occupancy
+import hotel_booking_app.src.processing.aggregation as aggregation
+import hotel_booking_app.src.preparation.schema as schema
+import hotel_booking_app.settings as setting
+from hotel_booking_app.src.instrumentation import step
+from hotel_booking_app.src.export import write_result
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
 
 
-def analyse_total_guests(csv_file_path, csv_file_save_to_path, selected_date,
-                         time_span):
+def analyse_total_guests(dataset, csv_file_save_to_path, selected_date,
+                         time_span, instrumentation=None, exporter=None):
     """
     Calculate total number of adults, children, and babies expected
     to be in residence per day within a time span.
 
-    :param csv_file_path: Path of csv file containing relevant data
-    :param csv_file_save_to_path: Path of result csv file
+    :param dataset: BookingDataset or path of csv file containing
+                    relevant data
+    :param csv_file_save_to_path: Path of result file, or None to not
+                                  save the result
     :param selected_date: Date in YYYY-MM-DD format
     :param time_span: Time span, in which guests should arrive (in days)
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :param exporter: ResultExporter saving the result in the background
+                     (optional)
+    :return: pandas data frame with total guests per day
     """
 
-    df_active_bookings = get_active_bookings(csv_file_path,
+    # Only columns needed for total guests are loaded from a csv file
+    df_active_bookings = get_active_bookings(dataset,
                                              selected_date,
-                                             time_span)
+                                             time_span,
+                                             instrumentation,
+                                             schema.OCCUPANCY_COLUMNS)
 
     # Check if dataframe is empty.
-    # If so, create empty result dataframe and save it to results
-    #  After that, return
+    # If so, create empty result dataframe
     if df_active_bookings.empty:
-        df_empty = pd.DataFrame(
-            columns=['stayed_date', 'adults',
-                     'children', 'babies', 'total_guests_per_day'])
-        # Save data frame to results
-        df_empty.to_csv(csv_file_save_to_path, index=False)
-        return
-
-    selected_date = pd.to_datetime(selected_date)
-
-    # Map each object into an unique integer.
-    # This insures mapping the right stayed dates to the booking
-    df_active_bookings['booking_id'] = \
-        pd.factorize(df_active_bookings.apply(tuple, axis=1))[0] + 1
-
-    # Get stayed dates of guests by calculating the range
-    # between arrival date and leaving date
-    df_stayed_dates = pd.concat([pd.Series(r.booking_id,
-                                           pd.date_range(start=r.arrival_date,
-                                                         end=r.leaving_date,
-                                                         freq='D'))
-                                 for r in
-                                 df_active_bookings.itertuples()]).reset_index()
-
-    df_stayed_dates.columns = ['stayed_date', 'booking_id']
-
-    # Merge data frame of stayed dates
-    # with relevant columns from original data frame.
-    df_stayed_dates = pd.merge(df_stayed_dates, df_active_bookings[
-        ['booking_id', 'adults', 'children', 'babies']],
-                               on=['booking_id'])
-
-    df_stayed_dates['children'] = df_stayed_dates['children'].astype(int)
-
-    # Group stayed dates and sum corresponding guests fields.
-    # This results in total adults, children, and babies per day
-    df_total_guests = df_stayed_dates.groupby(['stayed_date'])[
-        ['adults', 'children', 'babies']].sum().reset_index()
-
-    # Sum up total adults, babies, and children to get total guests per day
-    df_total_guests['total_guests_per_day'] = \
-        df_total_guests['adults'] + \
-        df_total_guests['babies'] + \
-        df_total_guests['children']
-
-    # Get only bookings, that are within range of selected time span
-    df_total_guests = df_total_guests.loc[df_total_guests['stayed_date']
-        .between(selected_date,
-                 (selected_date + pd.to_timedelta(time_span, unit='days')))] \
-        .reset_index(drop=True)
+        df_total_guests = pd.DataFrame(
+            columns=occupancy.TOTAL_GUESTS_COLUMNS)
+    else:
+        # Sum up guests per stayed day with array operations
+        # instead of expanding every booking into its stayed dates
+        with step(instrumentation, 'sum_guests_per_day',
+                  df_active_bookings.shape[0]) as measured:
+            df_total_guests = occupancy.calculate_total_guests(
+                df_active_bookings, selected_date, time_span)
+            measured.rows_out = df_total_guests.shape[0]
 
     # Save data frame to results
-    df_total_guests.to_csv(csv_file_save_to_path, index=False)
+    save_result(df_total_guests, csv_file_save_to_path,
+                'write_total_guests_csv', instrumentation, exporter)
+
+    return df_total_guests
+
 
+def analyse_total_guests_forecast(dataset, save_to_path, selected_dates,
+                                  time_spans, one_file_per_date=False,
+                                  instrumentation=None):
+    """
+    Calculate total number of adults, children, and babies expected
+    to be in residence per day for several selected dates at once.
+
+    :param dataset: BookingDataset or path of csv file containing
+                    relevant data
+    :param save_to_path: Path of result csv file or, if one file per date
+                         is written, path of result directory
+    :param selected_dates: List or range of dates in YYYY-MM-DD format
+    :param time_spans: Time span in which guests should arrive (in days),
+                       either one for all dates or a list with one per date
+    :param one_file_per_date: If true, write one result csv file per date
+                              instead of one combined result csv file
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :return: pandas data frame with selected date and total guests per day
+    """
 
-def get_active_bookings(csv_file_path, selected_date,
-                        time_span):
+    selected_dates = pd.to_datetime(list(selected_dates))
+    time_spans = np.broadcast_to(np.asarray(time_spans, dtype=np.int64),
+                                 (len(selected_dates),))
+
+    if len(selected_dates) == 0:
+        df_forecast = pd.DataFrame(
+            columns=['selected_date'] + occupancy.TOTAL_GUESTS_COLUMNS)
+    else:
+        # Get all bookings, that are active within any of the time spans
+        first_date = selected_dates.min()
+        last_date = (selected_dates
+                     + pd.to_timedelta(time_spans, unit='days')).max()
+        df_active_bookings = get_active_bookings(
+            dataset, first_date, (last_date - first_date).days,
+            instrumentation, schema.OCCUPANCY_COLUMNS)
+
+        with step(instrumentation, 'sum_guests_per_day',
+                  df_active_bookings.shape[0]) as measured:
+            df_forecast = occupancy.calculate_total_guests_forecast(
+                df_active_bookings, selected_dates, time_spans)
+            measured.rows_out = df_forecast.shape[0]
+
+    with step(instrumentation, 'write_forecast_csv', df_forecast.shape[0]):
+        if one_file_per_date:
+            os.makedirs(save_to_path, exist_ok=True)
+
+            # Save result of every date with columns of total guests result
+            for selected_date in selected_dates:
+                df_forecast.loc[df_forecast['selected_date'] == selected_date,
+                                occupancy.TOTAL_GUESTS_COLUMNS] \
+                    .to_csv(os.path.join(save_to_path,
+                                         setting.RESULT_TOTAL_GUESTS_PER_DATE
+                                         % selected_date.strftime('%Y-%m-%d')),
+                            index=False)
+        else:
+            df_forecast.to_csv(save_to_path, index=False)
+
+    return df_forecast
+
+
+def analyse_daily_measures(dataset, csv_file_save_to_path, selected_date,
+                           time_span, measures=None, dimensions=None,
+                           instrumentation=None, exporter=None):
+    """
+    Calculate several measures per day, e.g. guests, room nights and
+    revenue, optionally per hotel or market segment, in one pass over
+    the bookings staying or leaving within the time span and save them as
+    one result.
+
+    :param dataset: BookingDataset or path of csv file containing
+                    relevant data
+    :param csv_file_save_to_path: Path of result file, or None to not
+                                  save the result
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span, in which guests should arrive (in days)
+    :param measures: List of names of aggregation.MEASURES, by default all
+                     measures
+    :param dimensions: List of dimension columns (optional)
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :param exporter: ResultExporter saving the result in the background
+                     (optional)
+    :return: pandas data frame with stayed date, dimensions and measures
+    """
+
+    # Bookings leaving on the selected date count as departures. They are
+    # active on the day before, with the time span extended by this day.
+    # Only columns needed for the measures are loaded from a csv file.
+    previous_date = (pd.to_datetime(selected_date)
+                     - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    df_bookings = get_active_bookings(
+        dataset, previous_date, int(time_span) + 1, instrumentation,
+        schema.OCCUPANCY_COLUMNS + ['adr'] + list(dimensions or []))
+
+    with step(instrumentation, 'aggregate_daily',
+              df_bookings.shape[0]) as measured:
+        df_daily = aggregation.aggregate_daily(
+            df_bookings, selected_date, time_span, measures, dimensions)
+        measured.rows_out = df_daily.shape[0]
+
+    save_result(df_daily, csv_file_save_to_path, 'write_daily_measures_csv',
+                instrumentation, exporter)
+
+    return df_daily
+
+
+def get_active_bookings(dataset, selected_date,
+                        time_span, instrumentation=None, columns=None):
     """
     Analyse active bookings depending on selected date.
 
-    :param csv_file_path: Path of csv file containing relevant data
+    :param dataset: BookingDataset or path of csv file containing
+                    relevant data
     :param selected_date: Date (YYYY-MM-DD)
     :param time_span: Time span in which guests should arrive (in days)
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :param columns: List of columns to load, if dataset is a path of a csv
+                    file, or None to load all columns
 
     :return: pandas data frame with all active bookings
 
     """
-    df = pd.read_csv(csv_file_path)
-
-    selected_date = pd.to_datetime(selected_date)
-
-    # Map month full names to month integer.
-    # This is necessary in order to be able to map year,
-    # month, and day to date.
-    df['arrival_date_month'] = pd.to_datetime(df['arrival_date_month'],
-                                              format='%B').dt.month
-
-    # Map arrival year, month, and day to new data frame
-    # This is necessary in order to be able to convert them to datetime
-    df2 = df[["arrival_date_year", "arrival_date_month",
-              "arrival_date_day_of_month"]].copy()
-    df2.columns = ["year", "month", "day"]
-
-    # Convert year, month, and day of arrival to date of arrival
-    df['arrival_date'] = pd.to_datetime(df2)
-
-    # Add stays to arrival date to get leaving date
-    df['leaving_date'] = pd.DatetimeIndex(df['arrival_date']) \
-                         + pd.to_timedelta(df['stays_in_weekend_nights'],
-                                           unit='d') \
-                         + pd.to_timedelta(df['stays_in_week_nights'], unit='d')
-
-    # Get all bookings where ->
-    # leaving date is not earlier than current date
-    # and arrival date is not later than selected date plus time_span days
-    # and the booking is not cancelled
-    # This ensures, that you only get bookings that are currently active or
-    # begin in the next x days (x -> time_span)
-    df_active_bookings = df.loc[
-        ~((df['leaving_date'] <= selected_date)
-          | (df['arrival_date'] > selected_date + dt.timedelta(days=time_span)))
-        & (df['is_canceled'] == 0)]
+
+    # Reading the csv file includes deriving arrival and leaving dates
+    if not isinstance(dataset, BookingDataset):
+        with step(instrumentation, 'load_dataset') as measured:
+            dataset = BookingDataset.load(dataset, columns)
+            measured.rows_out = dataset.data.shape[0]
+
+    with step(instrumentation, 'select_active_bookings',
+              dataset.data.shape[0]) as measured:
+        df_active_bookings = dataset.get_active_bookings(selected_date,
+                                                         time_span)
+        measured.rows_out = df_active_bookings.shape[0]
 
     return df_active_bookings
 
 
-def analyse_active_bookings(csv_file_path, csv_file_save_to_path, selected_date,
-                            time_span):
+def analyse_active_bookings(dataset, csv_file_save_to_path, selected_date,
+                            time_span, instrumentation=None, exporter=None):
     """
     Create result table of all active bookings.
     Includes:
 
     - Call function to get data frame of active bookings
-    - Clean data frame in order to save it as result CSV file
+    - Clean data frame in order to save it as result file
 
-    :param csv_file_path: Path of csv file containing relevant data
-    :param csv_file_save_to_path: Path of result csv file
+    :param dataset: BookingDataset or path of csv file containing
+                    relevant data
+    :param csv_file_save_to_path: Path of result file, or None to not
+                                  save the result
     :param selected_date: Date in YYYY-MM-DD format
     :param time_span: Time span in which guests should arrive (in days)
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :param exporter: ResultExporter saving the result in the background
+                     (optional)
+    :return: pandas data frame with all active bookings
     """
 
     # Get all active bookings
-    df_active_bookings = get_active_bookings(csv_file_path,
+    df_active_bookings = get_active_bookings(dataset,
                                              selected_date,
-                                             time_span)
+                                             time_span,
+                                             instrumentation)
 
     # Prepare data frame for saving
     # Drop unnecessary analysis columns
-    df_active_bookings.drop(['leaving_date', 'arrival_date'],
-                            axis=1,
-                            inplace=True)
-
-    # Drop columns with unnamed in name
-    df_active_bookings.drop(
-        df_active_bookings.columns[df_active_bookings.columns.str
-            .contains('unnamed', case=False)],
-        axis=1,
-        inplace=True)
-
-    # Convert month int to month name again
-    df_active_bookings['arrival_date_month'] = \
-        pd.to_datetime(df_active_bookings['arrival_date_month'],
-                       format='%m').dt.month_name()
+    df_active_bookings = df_active_bookings.drop(
+        occupancy.DAY_COLUMNS, axis=1)
 
     # Save dataframe to results
-    df_active_bookings.to_csv(csv_file_save_to_path, index=False)
+    save_result(df_active_bookings, csv_file_save_to_path,
+                'write_active_bookings_csv', instrumentation, exporter)
+
+    return df_active_bookings
+
+
+def save_result(df, file_path, step_name, instrumentation=None,
+                exporter=None):
+    """
+    Save result data frame, in the background if an exporter is given.
+
+    :param df: pandas data frame containing result
+    :param file_path: Path of result file, or None to not save the result
+    :param step_name: Name of measured step
+    :param instrumentation: Instrumentation measuring every step (optional)
+    :param exporter: ResultExporter saving the result in the background
+                     (optional)
+    """
+
+    if file_path is None:
+        return
+
+    if exporter is not None:
+        exporter.submit(df, file_path, step_name)
+    else:
+        with step(instrumentation, step_name, df.shape[0]):
+            write_result(df, file_path)
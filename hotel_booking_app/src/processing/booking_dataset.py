@@ -0,0 +1,131 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Load and normalize hotel bookings once"
+
+#######################################################################
+
+import pandas as pd
+import hotel_booking_app.src.preparation.schema as schema
+from hotel_booking_app.src.processing.interval_index import \
+    BookingIntervalIndex
+from hotel_booking_app.src.processing.occupancy import get_stay_days, \
+    to_day_numbers
+
+
+class BookingDataset:
+    """
+    Class that holds normalized hotel booking data in memory.
+    The data is loaded and prepared once and can then be queried by
+    all analysis functions.
+    """
+
+    def __init__(self, df):
+        """
+        Initialize class BookingDataset
+
+        :param df: pandas data frame containing hotel bookings
+        """
+        self.data = self.normalize(df)
+        self._interval_index = None
+
+    @classmethod
+    def from_csv(cls, csv_file_path, columns=None):
+        """
+        Load booking dataset from csv file with compact column types.
+
+        :param csv_file_path: Path of csv file containing relevant data
+        :param columns: List of columns to load, or None to load all columns
+        :return: BookingDataset
+        """
+        return cls(schema.convert_types(
+            pd.read_csv(csv_file_path, **schema.read_options(columns))))
+
+    @classmethod
+    def load(cls, source, columns=None):
+        """
+        Return source if it already is a booking dataset,
+        otherwise load it from the given csv file path.
+
+        :param source: BookingDataset or path of csv file
+        :param columns: List of columns to load from csv file, or None to
+                        load all columns
+        :return: BookingDataset
+        """
+        if isinstance(source, cls):
+            return source
+
+        return cls.from_csv(source, columns)
+
+    @staticmethod
+    def normalize(df):
+        """
+        Normalize booking data frame and derive analysis columns.
+        Includes:
+
+        - Drop columns with unnamed in name (saved index columns)
+        - Convert is_canceled to a compact integer column
+        - Derive arrival_day and leaving_day as day numbers
+          (days since 1970-01-01), the month text is kept
+
+        :param df: pandas data frame containing hotel bookings
+        :return: normalized pandas data frame
+        """
+
+        df = df.loc[:, ~df.columns.str.contains('unnamed', case=False)].copy()
+
+        df['is_canceled'] = df['is_canceled'].astype('int8')
+
+        # Convert year, month name, and day of arrival to day numbers
+        # of arrival and leaving, looking up month numbers instead of
+        # parsing dates
+        df['arrival_day'], df['leaving_day'] = get_stay_days(df)
+
+        return df
+
+    @property
+    def interval_index(self):
+        """
+        Interval index over stays of non-cancelled bookings.
+        It is built on first access and reused by all following queries.
+
+        :return: BookingIntervalIndex
+        """
+        if self._interval_index is None:
+            self._interval_index = BookingIntervalIndex(
+                self.data['arrival_day'].to_numpy(),
+                self.data['leaving_day'].to_numpy(),
+                self.data['is_canceled'].to_numpy())
+
+        return self._interval_index
+
+    def get_active_positions(self, selected_date, time_span):
+        """
+        Get row positions of active bookings depending on selected date.
+
+        :param selected_date: Date (YYYY-MM-DD)
+        :param time_span: Time span in which guests should arrive (in days)
+        :return: numpy array of ascending row positions
+        """
+
+        first_day = to_day_numbers([pd.to_datetime(selected_date)])[0]
+
+        # Get all bookings where ->
+        # leaving date is not earlier than current date
+        # and arrival date is not later than selected date plus time_span days
+        # and the booking is not cancelled
+        # This ensures, that you only get bookings that are currently active or
+        # begin in the next x days (x -> time_span)
+        return self.interval_index.query(first_day,
+                                         first_day + int(time_span))
+
+    def get_active_bookings(self, selected_date, time_span):
+        """
+        Get active bookings depending on selected date.
+
+        :param selected_date: Date (YYYY-MM-DD)
+        :param time_span: Time span in which guests should arrive (in days)
+        :return: pandas data frame with all active bookings
+        """
+
+        return self.data.iloc[self.get_active_positions(selected_date,
+                                                        time_span)]
@@ -0,0 +1,639 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Update stored bookings and occupancy incrementally"
+
+#######################################################################
+
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.processing.occupancy as occupancy
+from hotel_booking_app.src.preparation.data_cache import read_columns, \
+    write_columns
+from hotel_booking_app.src.preparation.identity import KEY_COLUMN, \
+    add_booking_keys, get_booking_keys, get_identity_columns
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+
+STORE_NAME = 'store.json'
+STATE_NAME = 'state.npz'
+KEYS_NAME = 'keys.npy'
+OVERLAY_NAMES = ['keys', 'segments', 'rows']
+
+
+class IncrementalStore:
+    """
+    Class that stores bookings together with their occupancy per day and
+    updates both with delta files of new, changed and cancelled bookings.
+
+    Bookings are identified by a 64-bit store key, which is the booking
+    key of identity.add_booking_keys or the hash of the key columns.
+    The stored bookings consist of a base snapshot sorted by store key plus
+    one segment per applied delta with the current version of its
+    bookings. An overlay index sorted by store key points to the latest
+    version of every changed booking, so previous versions are found by
+    binary search without loading all bookings.
+
+    The sums per day of stays, adults, children, babies and departures of
+    non-cancelled bookings are only changed for the days covered by the
+    changed bookings. They are saved together with the overlay index in
+    one state file, which is replaced at once after the segment of a delta
+    is written, so an interrupted update leaves the previous state.
+    """
+
+    def __init__(self, store_path, compact_ratio=None):
+        """
+        Initialize class IncrementalStore from an existing store.
+        Only the state and the memory-mapped keys of the snapshot are
+        loaded, the bookings are read when needed.
+
+        :param store_path: Path of store directory
+        :param compact_ratio: Maximum number of changed bookings relative
+                              to the bookings of the snapshot, before all
+                              bookings are saved as new snapshot, or None
+                              to only compact explicitly
+        """
+        self.store_path = store_path
+        self.compact_ratio = compact_ratio
+
+        with open(os.path.join(store_path, STORE_NAME)) as store_file:
+            store = json.load(store_file)
+
+        self.key_columns = store['key_columns']
+        self.identity_columns = store['identity_columns']
+
+        with np.load(os.path.join(store_path, STATE_NAME)) as state:
+            self.first_day = int(state['first_day'])
+            self.generation = int(state['generation'])
+            self.n_deltas = int(state['n_deltas'])
+            self.overlay = {name: state['overlay_' + name]
+                            for name in OVERLAY_NAMES}
+            self.sums = {name[len('sum_'):]: state[name]
+                         for name in state.files if name.startswith('sum_')}
+
+        self.snapshot_keys = np.load(
+            os.path.join(self.snapshot_path(), KEYS_NAME), mmap_mode='r')
+
+    @classmethod
+    def create(cls, store_path, df, key_columns=None, compact_ratio=None):
+        """
+        Create store from all bookings.
+
+        :param store_path: Path of store directory
+        :param df: pandas data frame containing bookings
+        :param key_columns: Names of columns identifying a booking, or None
+                            to add booking keys hashed from the columns,
+                            which do not change (identity columns)
+        :param compact_ratio: See IncrementalStore.__init__
+        :return: IncrementalStore
+        """
+
+        identity_columns = None
+
+        # Equal bookings get distinct keys, so they are stored separately
+        if key_columns is None:
+            identity_columns = get_identity_columns(df.columns)
+            df = add_booking_keys(df, identity_columns, numbered=True)
+            key_columns = [KEY_COLUMN]
+
+        missing_columns = set(key_columns) - set(df.columns)
+        if missing_columns:
+            raise ValueError('Bookings miss key columns: %s'
+                             % ', '.join(sorted(missing_columns)))
+
+        keys = get_store_keys(df, key_columns)
+        if len(np.unique(keys)) < len(keys):
+            raise ValueError('Bookings are not unique by %s'
+                             % ', '.join(key_columns))
+
+        os.makedirs(store_path, exist_ok=True)
+
+        with open(os.path.join(store_path, STORE_NAME), 'w') as store_file:
+            json.dump({'key_columns': list(key_columns),
+                       'identity_columns': identity_columns}, store_file)
+
+        write_snapshot(df, keys, os.path.join(store_path, 'bookings_000001'))
+
+        # Calculate occupancy per day of all bookings
+        arrival_days, leaving_days, guests = get_stays(df)
+        first_day = int(arrival_days.min()) if len(arrival_days) else 0
+        n_days = int(leaving_days.max()) - first_day + 1 \
+            if len(leaving_days) else 0
+
+        sums = {}
+        for column, values in guests.items():
+            sums[column] = occupancy.sum_per_day(
+                arrival_days - first_day, leaving_days - first_day, values,
+                n_days)
+            sums['departing_' + column] = np.bincount(
+                leaving_days - first_day, values,
+                minlength=n_days).round().astype(np.int64)
+
+        # The state file is written last, so the store only exists, when
+        # it is complete
+        write_state(store_path, first_day=first_day, generation=1,
+                    n_deltas=0, overlay=create_overlay(), sums=sums)
+
+        return cls(store_path, compact_ratio)
+
+    @staticmethod
+    def exists(store_path):
+        """
+        Check if store exists.
+
+        :param store_path: Path of store directory
+        :return: True, if store exists
+        """
+        return os.path.isfile(os.path.join(store_path, STATE_NAME))
+
+    def snapshot_path(self, generation=None):
+        """
+        Get path of base snapshot.
+
+        :param generation: Number of snapshot, by default the current one
+        :return: Path of snapshot directory
+        """
+
+        if generation is None:
+            generation = self.generation
+
+        return os.path.join(self.store_path, 'bookings_%06d' % generation)
+
+    def delta_path(self, number):
+        """
+        Get path of saved delta.
+
+        :param number: Number of delta
+        :return: Path of delta directory
+        """
+        return os.path.join(self.store_path, 'deltas', '%06d' % number)
+
+    def get_keys(self, df):
+        """
+        Get store keys of bookings.
+
+        :param df: pandas data frame containing bookings
+        :return: numpy uint64 array of keys
+        """
+        return get_store_keys(df, self.key_columns)
+
+    def find_bookings(self, keys):
+        """
+        Load latest version of stored bookings.
+        Versions changed by a delta are looked up in the overlay index,
+        all other versions in the keys of the snapshot. Only the rows found
+        are read.
+
+        :param keys: numpy uint64 array of store keys
+        :return: Tuple of boolean array, true for stored keys, and pandas
+                 data frame with the bookings of the stored keys in the
+                 order of the keys
+        """
+
+        # Segment number of every key, 0 for the snapshot, -1 if unknown
+        sources = np.full(len(keys), -1, dtype=np.int64)
+        rows = np.zeros(len(keys), dtype=np.int64)
+
+        in_overlay, positions = find_keys(self.overlay['keys'], keys)
+        sources[in_overlay] = self.overlay['segments'][positions[in_overlay]]
+        rows[in_overlay] = self.overlay['rows'][positions[in_overlay]]
+
+        in_snapshot, positions = find_keys(self.snapshot_keys, keys)
+        in_snapshot &= ~in_overlay
+        sources[in_snapshot] = 0
+        rows[in_snapshot] = positions[in_snapshot]
+
+        is_stored = sources >= 0
+
+        # Read rows of every segment at once, with an empty frame of the
+        # snapshot columns, if no key is stored
+        frames = [read_columns(self.snapshot_path(),
+                               np.empty(0, dtype=np.int64))]
+        order = []
+        for source in np.unique(sources[is_stored]):
+            selected = np.flatnonzero(sources == source)
+            path = self.delta_path(source) if source else \
+                self.snapshot_path()
+            frames.append(read_columns(path, rows[selected]))
+            order.append(selected)
+
+        df_stored = concat_bookings(frames)
+
+        # Restore order of keys
+        if order:
+            df_stored = df_stored.iloc[
+                np.argsort(np.concatenate(order), kind='stable')] \
+                .reset_index(drop=True)
+
+        return is_stored, df_stored
+
+    def read_bookings(self):
+        """
+        Load latest version of all stored bookings.
+
+        :return: pandas data frame containing bookings
+        """
+
+        df_snapshot = read_columns(self.snapshot_path())
+
+        if len(self.overlay['keys']) == 0:
+            return df_snapshot
+
+        # Replace changed bookings of the snapshot by their latest version
+        is_changed, _ = find_keys(self.overlay['keys'],
+                                  np.asarray(self.snapshot_keys))
+        frames = [df_snapshot.loc[~is_changed]]
+
+        for segment in np.unique(self.overlay['segments']):
+            frames.append(read_columns(
+                self.delta_path(segment),
+                self.overlay['rows'][self.overlay['segments'] == segment]))
+
+        return concat_bookings(frames)
+
+    def upsert(self, df_delta):
+        """
+        Get previous and current version of new and changed bookings.
+        Columns missing in the delta and empty cells keep their stored
+        values.
+
+        :param df_delta: pandas data frame containing changed bookings
+                         with unique keys
+        :return: Tuple of data frames with previous and current version
+                 of changed bookings and store keys of current version
+        """
+
+        df_delta = df_delta.reset_index(drop=True)
+        keys = self.get_keys(df_delta)
+
+        is_existing, df_previous = self.find_bookings(keys)
+        columns = [column for column in df_delta.columns
+                   if column in df_previous.columns]
+
+        # Update existing bookings cell by cell, so empty cells of a
+        # delta row keep the stored values as well
+        df_updated = df_previous.copy()
+        df_updated[columns] = df_delta.loc[is_existing, columns] \
+            .reset_index(drop=True).combine_first(df_previous[columns])
+
+        # Insert new bookings
+        df_inserted = df_delta.loc[~is_existing] \
+            .reindex(columns=df_previous.columns)
+
+        df_current = concat_bookings([df_updated, df_inserted])
+
+        return df_previous, df_current, np.concatenate(
+            [keys[is_existing], keys[~is_existing]])
+
+    def apply_delta(self, df_delta):
+        """
+        Apply delta of new, changed and cancelled bookings.
+        Includes:
+
+        - Validate delta
+        - Find previous version of changed bookings
+        - Update occupancy per day of affected days
+        - Save current version of changed bookings and new state
+
+        :param df_delta: pandas data frame containing changed bookings,
+                         a cancellation has is_canceled set to 1
+        :return: pandas data frame with total guests of affected days
+        """
+
+        # Booking keys are hashed from the identity columns of the delta,
+        # unless the delta contains them
+        if self.key_columns == [KEY_COLUMN] \
+                and KEY_COLUMN not in df_delta.columns:
+            missing_columns = set(self.identity_columns) \
+                - set(df_delta.columns)
+            if missing_columns:
+                raise ValueError('Delta misses %s or identity columns: %s'
+                                 % (KEY_COLUMN,
+                                    ', '.join(sorted(missing_columns))))
+
+            df_delta = add_booking_keys(df_delta, self.identity_columns,
+                                        numbered=True)
+
+        missing_columns = set(self.key_columns) - set(df_delta.columns)
+        if missing_columns:
+            raise ValueError('Delta misses key columns: %s'
+                             % ', '.join(sorted(missing_columns)))
+
+        # Last change of a booking wins
+        df_delta = df_delta.loc[
+            ~pd.Series(self.get_keys(df_delta)).duplicated(keep='last')
+            .to_numpy()]
+
+        df_previous, df_current, keys = self.upsert(df_delta)
+
+        # Remove previous stays and add current stays
+        previous_stays = get_stays(df_previous)
+        current_stays = get_stays(df_current)
+        arrival_days = np.concatenate([previous_stays[0], current_stays[0]])
+        leaving_days = np.concatenate([previous_stays[1], current_stays[1]])
+
+        first_day, n_days = 0, 0
+        sums_first_day, sums = self.first_day, self.sums
+
+        if len(arrival_days):
+            # Only days between first arrival and last leaving day of the
+            # changed bookings are updated, on copies of the sums
+            first_day = int(arrival_days.min())
+            n_days = int(leaving_days.max()) - first_day + 1
+            sums_first_day, sums = self.extend_days(first_day,
+                                                    first_day + n_days - 1)
+            days = slice(first_day - sums_first_day,
+                         first_day - sums_first_day + n_days)
+
+            for column in previous_stays[2]:
+                values = np.concatenate([-previous_stays[2][column],
+                                         current_stays[2][column]])
+                sums[column][days] += occupancy.sum_per_day(
+                    arrival_days - first_day, leaving_days - first_day,
+                    values, n_days)
+                sums['departing_' + column][days] += np.bincount(
+                    leaving_days - first_day, values,
+                    minlength=n_days).round().astype(np.int64)
+
+        # Save current version of changed bookings as new segment, before
+        # the state pointing to it is saved
+        segment = self.n_deltas + 1
+        shutil.rmtree(self.delta_path(segment), ignore_errors=True)
+        write_columns(df_current, self.delta_path(segment))
+
+        is_replaced = np.isin(self.overlay['keys'], keys)
+        overlay = {
+            'keys': np.concatenate([self.overlay['keys'][~is_replaced],
+                                    keys]),
+            'segments': np.concatenate([
+                self.overlay['segments'][~is_replaced],
+                np.full(len(keys), segment, dtype=np.int64)]),
+            'rows': np.concatenate([self.overlay['rows'][~is_replaced],
+                                    np.arange(len(keys), dtype=np.int64)])}
+        order = np.argsort(overlay['keys'], kind='stable')
+
+        self.overlay = {name: values[order]
+                        for name, values in overlay.items()}
+        self.first_day, self.sums = sums_first_day, sums
+        self.n_deltas = segment
+        self.save()
+
+        if self.compact_ratio is not None and len(self.overlay['keys']) \
+                > self.compact_ratio * len(self.snapshot_keys):
+            self.compact()
+
+        # Get days, on which any changed booking stays
+        is_affected = occupancy.sum_per_day(
+            arrival_days - first_day, leaving_days - first_day,
+            np.ones(len(arrival_days), dtype=np.int64), n_days) > 0
+
+        return self.create_changes_frame(
+            np.arange(first_day, first_day + n_days)[is_affected])
+
+    def extend_days(self, first_day, last_day):
+        """
+        Get copy of sums per day, which covers first day to last day.
+
+        :param first_day: Day number of first day
+        :param last_day: Day number of last day
+        :return: Tuple of day number of first day of sums and dictionary
+                 of sums per day
+        """
+
+        n_days = len(self.sums['stays'])
+        sums_first_day = first_day if n_days == 0 else self.first_day
+
+        before = max(0, sums_first_day - first_day)
+        after = max(0, last_day - (sums_first_day + n_days - 1))
+
+        return sums_first_day - before, \
+            {column: np.pad(values, (before, after))
+             for column, values in self.sums.items()}
+
+    def create_changes_frame(self, days):
+        """
+        Create data frame with total guests of days.
+        Unlike total guests results, days without guests are included.
+
+        :param days: Integer array of day numbers
+        :return: pandas data frame with total guests per day
+        """
+
+        positions = days - self.first_day
+
+        df_changes = pd.DataFrame({
+            'stayed_date': pd.to_datetime(days.astype('datetime64[D]'))})
+
+        for column in occupancy.GUEST_COLUMNS:
+            df_changes[column] = self.sums[column][positions]
+
+        df_changes['total_guests_per_day'] = \
+            df_changes['adults'] + \
+            df_changes['babies'] + \
+            df_changes['children']
+
+        return df_changes
+
+    def calculate_total_guests(self, selected_date, time_span):
+        """
+        Calculate total guests per day within a time span from the stored
+        occupancy, without touching the bookings.
+
+        :param selected_date: Date in YYYY-MM-DD format
+        :param time_span: Time span, in which guests should arrive (in days)
+        :return: pandas data frame with total guests per day
+        """
+
+        first_day = occupancy.to_day_numbers(
+            [pd.to_datetime(selected_date)])[0]
+        days = np.arange(first_day, first_day + int(time_span) + 1)
+        positions = days - self.first_day
+        is_stored = (positions >= 0) & (positions < len(self.sums['stays']))
+
+        sums = {}
+        for column in ['stays'] + occupancy.GUEST_COLUMNS:
+            sums[column] = np.zeros(len(days), dtype=np.int64)
+            sums[column][is_stored] = self.sums[column][positions[is_stored]]
+
+            # Bookings leaving on the selected date are not active
+            if is_stored[0]:
+                sums[column][0] -= \
+                    self.sums['departing_' + column][positions[0]]
+
+        return occupancy.create_total_guests_frame(days, sums)
+
+    def save(self):
+        """
+        Save state of store, i.e. occupancy per day, overlay index and
+        numbers of snapshot and deltas.
+        """
+        write_state(self.store_path, first_day=self.first_day,
+                    generation=self.generation, n_deltas=self.n_deltas,
+                    overlay=self.overlay, sums=self.sums)
+
+    def compact(self):
+        """
+        Save all bookings as new base snapshot and remove saved deltas.
+        Opening the store afterwards does not need the deltas.
+        """
+
+        df_bookings = self.read_bookings()
+        generation = self.generation + 1
+        previous_path = self.snapshot_path()
+
+        shutil.rmtree(self.snapshot_path(generation), ignore_errors=True)
+        write_snapshot(df_bookings, self.get_keys(df_bookings),
+                       self.snapshot_path(generation))
+
+        self.generation = generation
+        self.n_deltas = 0
+        self.overlay = create_overlay()
+        self.save()
+
+        # Previous files are removed after the new state is saved
+        self.snapshot_keys = np.load(
+            os.path.join(self.snapshot_path(), KEYS_NAME), mmap_mode='r')
+        shutil.rmtree(previous_path, ignore_errors=True)
+        shutil.rmtree(os.path.join(self.store_path, 'deltas'),
+                      ignore_errors=True)
+
+
+def get_store_keys(df, key_columns):
+    """
+    Get store keys of bookings, i.e. their booking key or the hash of
+    their key columns.
+
+    :param df: pandas data frame containing bookings
+    :param key_columns: Names of columns identifying a booking
+    :return: numpy uint64 array of keys
+    """
+
+    if list(key_columns) == [KEY_COLUMN]:
+        return df[KEY_COLUMN].to_numpy(dtype=np.uint64)
+
+    return get_booking_keys(df, key_columns).to_numpy()
+
+
+def find_keys(sorted_keys, keys):
+    """
+    Find keys in sorted keys by binary search.
+
+    :param sorted_keys: Sorted numpy uint64 array
+    :param keys: numpy uint64 array of keys to find
+    :return: Tuple of boolean array, true for found keys, and integer
+             array of their positions in the sorted keys
+    """
+
+    positions = np.searchsorted(sorted_keys, keys)
+
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool), positions
+
+    positions = np.minimum(positions, len(sorted_keys) - 1)
+
+    return sorted_keys[positions] == keys, positions
+
+
+def create_overlay():
+    """
+    Create empty overlay index.
+
+    :return: Dictionary of keys, segment numbers and row positions
+    """
+    return {'keys': np.empty(0, dtype=np.uint64),
+            'segments': np.empty(0, dtype=np.int64),
+            'rows': np.empty(0, dtype=np.int64)}
+
+
+def write_snapshot(df, keys, directory_path):
+    """
+    Save bookings sorted by store key together with their keys.
+
+    :param df: pandas data frame containing bookings
+    :param keys: numpy uint64 array of store keys of bookings
+    :param directory_path: Path of snapshot directory
+    """
+
+    order = np.argsort(keys, kind='stable')
+
+    write_columns(df.iloc[order].reset_index(drop=True), directory_path)
+    np.save(os.path.join(directory_path, KEYS_NAME), keys[order])
+
+
+def write_state(store_path, first_day, generation, n_deltas, overlay, sums):
+    """
+    Save state of store in one file, which replaces the previous state at
+    once.
+
+    :param store_path: Path of store directory
+    :param first_day: Day number of first day of sums
+    :param generation: Number of base snapshot
+    :param n_deltas: Number of saved deltas
+    :param overlay: Dictionary of overlay index
+    :param sums: Dictionary of sums per day
+    """
+
+    state_path = os.path.join(store_path, STATE_NAME)
+    temporary_path = state_path + '.tmp'
+
+    arrays = {'overlay_' + name: values for name, values in overlay.items()}
+    arrays.update({'sum_' + column: values
+                   for column, values in sums.items()})
+
+    with open(temporary_path, 'wb') as state_file:
+        np.savez(state_file, first_day=first_day, generation=generation,
+                 n_deltas=n_deltas, **arrays)
+
+    os.replace(temporary_path, state_path)
+
+
+def concat_bookings(frames):
+    """
+    Concatenate bookings.
+    Categorical columns become text columns, if the frames have different
+    categories, so the categories are merged.
+
+    :param frames: List of pandas data frames containing bookings
+    :return: pandas data frame
+    """
+
+    # Empty frames do not change the column types
+    df = pd.concat([df for df in frames if len(df)] or frames[:1],
+                   ignore_index=True)
+
+    for column in df.columns:
+        dtypes = [frame[column].dtype for frame in frames
+                  if column in frame.columns
+                  and isinstance(frame[column].dtype, pd.CategoricalDtype)]
+
+        if dtypes and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            categories = dtypes[0].categories
+            for dtype in dtypes[1:]:
+                categories = categories.append(
+                    dtype.categories.difference(categories))
+
+            new_values = pd.Index(df[column].dropna().unique()) \
+                .difference(categories)
+            df[column] = df[column].astype(pd.CategoricalDtype(
+                categories.append(new_values), dtypes[0].ordered))
+
+    return df
+
+
+def get_stays(df_bookings):
+    """
+    Get arrival day, leaving day and guests of non-cancelled bookings.
+
+    :param df_bookings: pandas data frame containing bookings
+    :return: Tuple of arrival days, leaving days and dictionary of guests
+    """
+
+    # Cancelled bookings of a delta may only contain the key columns and
+    # is_canceled, so they are removed before deriving dates
+    df_bookings = BookingDataset.normalize(
+        df_bookings.loc[(df_bookings['is_canceled'] == 0).fillna(False)])
+
+    return (df_bookings['arrival_day'].to_numpy(dtype=np.int64),
+            df_bookings['leaving_day'].to_numpy(dtype=np.int64),
+            occupancy.get_guest_counts(df_bookings))
@@ -0,0 +1,94 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Interval index for date window queries"
+
+#######################################################################
+
+import numpy as np
+
+
+class BookingIntervalIndex:
+    """
+    Class that indexes stays of non-cancelled bookings for date window
+    queries.
+
+    Bookings are grouped by the length of their stay, each group covers
+    stays of up to twice the length of the shortest stay in it. Within a
+    group, bookings are sorted by arrival day and the running maximum of
+    the leaving day is stored. A query only has to check the bookings
+    between the first booking whose running maximum lies after the start of
+    the window and the last booking arriving within the window. Since the
+    stays of a group have similar lengths, a single long stay does not make
+    a query check all bookings arriving before it.
+    """
+
+    def __init__(self, arrival_days, leaving_days, is_canceled):
+        """
+        Initialize class BookingIntervalIndex
+
+        :param arrival_days: Integer array of arrival day numbers
+        :param leaving_days: Integer array of leaving day numbers
+        :param is_canceled: Array, which is 1 for cancelled bookings
+        """
+
+        arrival_days = np.asarray(arrival_days)
+        leaving_days = np.asarray(leaving_days)
+
+        # Only keep positions of bookings that are not cancelled
+        positions = np.flatnonzero(np.asarray(is_canceled) == 0)
+
+        # Sort bookings by arrival day
+        positions = positions[np.argsort(arrival_days[positions],
+                                         kind='stable')]
+
+        # Group stays by their length: 1 night, 2-3 nights, 4-7 nights, ...
+        stay_lengths = leaving_days[positions] - arrival_days[positions]
+        groups = np.floor(np.log2(np.maximum(stay_lengths, 1))) \
+            .astype(np.int8)
+
+        # Sort bookings by group, the stable sort keeps them sorted by
+        # arrival day within each group
+        order = np.argsort(groups, kind='stable')
+        positions = positions[order]
+        bounds = np.flatnonzero(np.diff(groups[order])) + 1
+
+        self.groups = []
+        for group_positions in np.split(positions, bounds) \
+                if len(positions) else []:
+            group_leaving_days = leaving_days[group_positions]
+
+            # Running maximum of leaving days, which is sorted ascending
+            self.groups.append((
+                group_positions,
+                arrival_days[group_positions],
+                group_leaving_days,
+                np.maximum.accumulate(group_leaving_days)))
+
+    def query(self, first_day, last_day):
+        """
+        Get row positions of bookings, which leave after the first day
+        and arrive on or before the last day.
+
+        :param first_day: Day number of first day of window
+        :param last_day: Day number of last day of window
+        :return: numpy array of ascending row positions
+        """
+
+        group_positions = []
+
+        for positions, arrival_days, leaving_days, max_leaving_days \
+                in self.groups:
+            # Bookings before start all leave on or before the first day,
+            # bookings from end onwards all arrive after the last day
+            start = np.searchsorted(max_leaving_days, first_day, side='right')
+            end = np.searchsorted(arrival_days, last_day, side='right')
+
+            if start < end:
+                candidates = slice(start, end)
+                group_positions.append(positions[candidates][
+                    leaving_days[candidates] > first_day])
+
+        if not group_positions:
+            return np.empty(0, dtype=np.intp)
+
+        return np.sort(np.concatenate(group_positions))
@@ -0,0 +1,278 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Vectorized occupancy engine"
+
+#######################################################################
+
+import calendar
+import numpy as np
+import pandas as pd
+
+# Month numbers of month names, e.g. 'July' to 7
+MONTH_NUMBERS = {name: number for number, name in
+                 enumerate(calendar.month_name) if number}
+
+# Columns of arrival and leaving day numbers derived from bookings
+DAY_COLUMNS = ['arrival_day', 'leaving_day']
+
+GUEST_COLUMNS = ['adults', 'children', 'babies']
+TOTAL_GUESTS_COLUMNS = ['stayed_date'] + GUEST_COLUMNS \
+                       + ['total_guests_per_day']
+
+
+def to_day_numbers(dates):
+    """
+    Convert dates to integer day numbers (days since 1970-01-01).
+
+    :param dates: Series, index or array of datetime values
+    :return: numpy int64 array of day numbers
+    """
+
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def get_month_numbers(months):
+    """
+    Get month numbers of month names.
+    Every distinct name is looked up once, instead of parsing every row.
+
+    :param months: Series or array of month names
+    :return: numpy int32 array of month numbers
+    """
+
+    codes, uniques = pd.factorize(months)
+
+    try:
+        numbers = np.array([MONTH_NUMBERS[name] for name in uniques],
+                           dtype=np.int32)
+    except KeyError as error:
+        raise ValueError('Unknown month name: %s' % error)
+
+    if (codes < 0).any():
+        raise ValueError('Month name is missing.')
+
+    return numbers[codes]
+
+
+def get_arrival_days(years, months, days_of_month):
+    """
+    Get day numbers (days since 1970-01-01) of arrival dates with integer
+    arithmetic.
+
+    :param years: Series or array of years
+    :param months: Series or array of month names
+    :param days_of_month: Series or array of days of month
+    :return: numpy int32 array of day numbers
+    """
+
+    # Months since 1970-01 are converted to the day number of the first
+    # day of the month, to which the day of the month is added
+    months = (np.asarray(years, dtype=np.int32) - 1970) * 12 \
+        + get_month_numbers(months) - 1
+
+    return months.astype('datetime64[M]').astype('datetime64[D]') \
+        .astype(np.int32) + np.asarray(days_of_month, dtype=np.int32) - 1
+
+
+def get_stay_days(df_bookings):
+    """
+    Get day numbers of arrival and leaving of bookings.
+
+    :param df_bookings: Data frame containing arrival date columns and
+                        stays in weekend and week nights
+    :return: Tuple of numpy int32 arrays of arrival and leaving days
+    """
+
+    arrival_days = get_arrival_days(df_bookings['arrival_date_year'],
+                                    df_bookings['arrival_date_month'],
+                                    df_bookings['arrival_date_day_of_month'])
+
+    # Add stays to arrival day to get leaving day
+    leaving_days = arrival_days \
+        + df_bookings['stays_in_weekend_nights'].to_numpy(dtype=np.int32) \
+        + df_bookings['stays_in_week_nights'].to_numpy(dtype=np.int32)
+
+    return arrival_days, leaving_days
+
+
+def get_guest_counts(df_bookings):
+    """
+    Get number of stays (one per booking) and guests of bookings.
+
+    :param df_bookings: Data frame containing adults, children and babies
+    :return: Dictionary of numpy int64 arrays
+    """
+
+    guests = {'stays': np.ones(len(df_bookings), dtype=np.int64)}
+
+    for column in GUEST_COLUMNS:
+        guests[column] = df_bookings[column].fillna(0).to_numpy() \
+            .astype(np.int64)
+
+    return guests
+
+
+def sum_per_day(start, end, values, n_days):
+    """
+    Sum values per day for stays from start up to and including end,
+    using a difference array over the day index.
+
+    :param start: Integer array of first day positions of stays
+    :param end: Integer array of last day positions of stays
+    :param values: Integer array of values per stay
+    :param n_days: Number of days of day index
+    :return: numpy int64 array of sums per day
+    """
+
+    # Add value at start of stay and remove it again after the leaving day.
+    # The cumulative sum then yields the total per day.
+    diff = np.bincount(start, values, minlength=n_days + 1) \
+        - np.bincount(end + 1, values, minlength=n_days + 1)
+
+    return np.cumsum(diff[:-1]).round().astype(np.int64)
+
+
+def create_total_guests_frame(days, sums):
+    """
+    Create total guests data frame from sums per day.
+    Only days on which at least one booking stays are part of the result.
+
+    :param days: Integer array of day numbers
+    :param sums: Dictionary of sums per day (stays, adults, children, babies)
+    :return: pandas data frame with total guests per day
+    """
+
+    occupied = sums['stays'] > 0
+
+    df_total_guests = pd.DataFrame({
+        'stayed_date': pd.to_datetime(days[occupied].astype('datetime64[D]'))})
+
+    for column in GUEST_COLUMNS:
+        df_total_guests[column] = sums[column][occupied]
+
+    # Sum up total adults, babies, and children to get total guests per day
+    df_total_guests['total_guests_per_day'] = \
+        df_total_guests['adults'] + \
+        df_total_guests['babies'] + \
+        df_total_guests['children']
+
+    return df_total_guests
+
+
+def sum_guests_per_day(df_active_bookings, first_day, last_day):
+    """
+    Sum stays and guests per day from first day up to and including
+    last day. Sums of several parts of the bookings can be added up.
+
+    :param df_active_bookings: Data frame containing arrival_day,
+                               leaving_day, adults, children and babies
+    :param first_day: Day number of first day
+    :param last_day: Day number of last day
+    :return: Dictionary of sums per day (stays, adults, children, babies)
+    """
+
+    n_days = last_day - first_day + 1
+
+    # Clip stays to the requested window.
+    # Day positions are relative to the first day of the window.
+    start = np.maximum(df_active_bookings['arrival_day'].to_numpy(),
+                       first_day) - first_day
+    end = np.minimum(df_active_bookings['leaving_day'].to_numpy(),
+                     last_day) - first_day
+    in_window = start <= end
+
+    return {column: sum_per_day(start[in_window], end[in_window],
+                                values[in_window], n_days)
+            for column, values in get_guest_counts(df_active_bookings).items()}
+
+
+def calculate_total_guests(df_active_bookings, selected_date, time_span):
+    """
+    Calculate total number of adults, children, and babies per day
+    within a time span, using difference arrays over a day index.
+
+    Every booking adds its guests to each day from arrival date up to and
+    including leaving date. Only days on which at least one booking stays
+    are part of the result.
+
+    :param df_active_bookings: Data frame containing arrival_day,
+                               leaving_day, adults, children and babies
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span, in which guests should arrive (in days)
+    :return: pandas data frame with total guests per day
+    """
+
+    first_day = to_day_numbers([pd.to_datetime(selected_date)])[0]
+    last_day = first_day + int(time_span)
+
+    return create_total_guests_frame(
+        np.arange(first_day, last_day + 1),
+        sum_guests_per_day(df_active_bookings, first_day, last_day))
+
+
+def calculate_total_guests_forecast(df_bookings, selected_dates, time_spans):
+    """
+    Calculate total guests per day for several selected dates and
+    time spans in one pass over the bookings.
+
+    The sums per day are calculated once over the range covering all
+    windows. A booking leaving on the selected date itself is not active
+    for this date, so the guests leaving on each day are summed as well
+    and subtracted from the first day of a window.
+
+    :param df_bookings: Data frame of non-cancelled bookings containing
+                        arrival_day, leaving_day, adults, children and
+                        babies
+    :param selected_dates: List of dates in YYYY-MM-DD format
+    :param time_spans: List of time spans (in days), one per selected date
+    :return: pandas data frame with selected date and total guests per day
+    """
+
+    first_days = to_day_numbers(pd.to_datetime(list(selected_dates)))
+    last_days = first_days + np.asarray(time_spans, dtype=np.int64)
+
+    if len(first_days) == 0:
+        return pd.DataFrame(columns=['selected_date'] + TOTAL_GUESTS_COLUMNS)
+
+    first_day = first_days.min()
+    last_day = last_days.max()
+    n_days = last_day - first_day + 1
+
+    # Clip stays to the range covering all windows
+    arrival_days = df_bookings['arrival_day'].to_numpy()
+    leaving_days = df_bookings['leaving_day'].to_numpy()
+    start = np.maximum(arrival_days, first_day) - first_day
+    end = np.minimum(leaving_days, last_day) - first_day
+    in_range = start <= end
+    leaves_in_range = in_range & (leaving_days <= last_day)
+
+    sums = {}
+    departures = {}
+    for column, values in get_guest_counts(df_bookings).items():
+        sums[column] = sum_per_day(start[in_range], end[in_range],
+                                   values[in_range], n_days)
+        departures[column] = np.bincount(
+            end[leaves_in_range], values[leaves_in_range],
+            minlength=n_days).round().astype(np.int64)
+
+    # Day positions of all windows, one after another
+    window_lengths = last_days - first_days + 1
+    window_starts = np.repeat(first_days - first_day, window_lengths)
+    offsets = np.arange(window_lengths.sum()) \
+        - np.repeat(np.cumsum(window_lengths) - window_lengths, window_lengths)
+    positions = window_starts + offsets
+    is_first_day = offsets == 0
+
+    window_sums = {}
+    for column in sums:
+        window_sums[column] = sums[column][positions]
+        window_sums[column][is_first_day] -= \
+            departures[column][positions[is_first_day]]
+
+    df_forecast = create_total_guests_frame(positions + first_day,
+                                            window_sums)
+    df_forecast.insert(0, 'selected_date', pd.to_datetime(
+        np.repeat(first_days, window_lengths)[window_sums['stays'] > 0]
+        .astype('datetime64[D]')))
+
+    return df_forecast
@@ -0,0 +1,185 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Daily occupancy cube of hotel bookings"
+
+#######################################################################
+
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.processing.occupancy as occupancy
+from hotel_booking_app.src.preparation.data_cache import write_columns, \
+    read_columns
+
+# Dimensions of the cube, besides the day
+DIMENSIONS = ['hotel', 'assigned_room_type']
+
+# Measures of the cube per day and dimension values:
+#   - adults, children, babies: Guests in residence, including the day
+#                               of leaving
+#   - departing_*: Guests leaving on the day
+#   - room_nights: Bookings staying the night after the day
+#   - arrivals, departures: Bookings arriving or leaving on the day
+DEPARTING_COLUMNS = ['departing_' + column
+                     for column in occupancy.GUEST_COLUMNS]
+MEASURES = occupancy.GUEST_COLUMNS + DEPARTING_COLUMNS \
+    + ['room_nights', 'arrivals', 'departures']
+
+
+def build_cube(df_bookings, dimensions=None):
+    """
+    Sum measures of non-cancelled bookings per day and dimension values.
+    Only combinations with at least one booking on the day are part of the
+    cube, which is sorted by day.
+
+    :param df_bookings: pandas data frame containing prepared bookings
+    :param dimensions: List of dimension columns, by default all columns
+                       of DIMENSIONS contained in the bookings
+    :return: pandas data frame with day number, dimensions and measures
+    """
+
+    if dimensions is None:
+        dimensions = [column for column in DIMENSIONS
+                      if column in df_bookings.columns]
+
+    df_bookings = df_bookings.loc[
+        (df_bookings['is_canceled'] == 0).to_numpy()]
+
+    if df_bookings.empty:
+        return pd.DataFrame(columns=['day'] + dimensions + MEASURES)
+
+    arrival_days, leaving_days = occupancy.get_stay_days(df_bookings)
+
+    # Every combination of dimension values is a group with its own row
+    # of days, so the cube can be calculated with one difference array
+    if dimensions:
+        grouped = df_bookings.groupby(dimensions, observed=True,
+                                      dropna=False)
+        groups = grouped.ngroup().to_numpy()
+        df_groups = grouped.size().index.to_frame(index=False)
+    else:
+        groups = np.zeros(len(df_bookings), dtype=np.int64)
+        df_groups = pd.DataFrame(index=[0])
+
+    first_day = int(arrival_days.min())
+    n_days = int(leaving_days.max()) - first_day + 1
+    n_groups = len(df_groups)
+
+    # Day positions of all groups, one after another
+    start = groups * n_days + arrival_days - first_day
+    end = groups * n_days + leaving_days - first_day
+    size = n_groups * n_days
+
+    guests = occupancy.get_guest_counts(df_bookings)
+    ones = guests.pop('stays')
+
+    measures = {}
+    for column, values in guests.items():
+        measures[column] = occupancy.sum_per_day(start, end, values, size)
+        measures['departing_' + column] = np.bincount(
+            end, values, minlength=size).round().astype(np.int64)
+
+    # Nights are stayed from the arrival day up to the day before leaving
+    measures['room_nights'] = occupancy.sum_per_day(start, end - 1, ones,
+                                                    size)
+    measures['arrivals'] = np.bincount(start, minlength=size)
+    measures['departures'] = np.bincount(end, minlength=size)
+
+    # Keep combinations with at least one booking on the day, sorted by day
+    positions = np.flatnonzero(measures['room_nights']
+                               + measures['departures'] > 0)
+    positions = positions[np.argsort(positions % n_days, kind='mergesort')]
+
+    df_cube = df_groups.iloc[positions // n_days].reset_index(drop=True)
+    df_cube.insert(0, 'day',
+                   (positions % n_days + first_day).astype(np.int32))
+
+    for column in MEASURES:
+        df_cube[column] = measures[column][positions].astype(np.int32)
+
+    return df_cube
+
+
+def write_cube(df_cube, directory_path):
+    """
+    Save cube in a columnar binary layout.
+
+    :param df_cube: pandas data frame containing cube
+    :param directory_path: Path of directory
+    """
+    write_columns(df_cube, directory_path)
+
+
+def read_cube(directory_path):
+    """
+    Load cube saved in a columnar binary layout.
+
+    :param directory_path: Path of directory
+    :return: pandas data frame containing cube
+    """
+    return read_columns(directory_path)
+
+
+def slice_cube(df_cube, first_day, last_day, filters=None):
+    """
+    Get rows of cube from first day up to and including last day.
+    As the cube is sorted by day, the rows are found by binary search.
+
+    :param df_cube: pandas data frame containing cube
+    :param first_day: Day number of first day
+    :param last_day: Day number of last day
+    :param filters: Dictionary of dimension column and list of values,
+                    to which rows are restricted (optional)
+    :return: pandas data frame containing rows of cube
+    """
+
+    days = df_cube['day'].to_numpy()
+    df_slice = df_cube.iloc[np.searchsorted(days, first_day):
+                            np.searchsorted(days, last_day, side='right')]
+
+    for column, values in (filters or {}).items():
+        if column not in df_slice.columns:
+            raise ValueError('Cube has no dimension %s' % column)
+
+        df_slice = df_slice.loc[df_slice[column].isin(values).to_numpy()]
+
+    return df_slice
+
+
+def query_total_guests(df_cube, selected_date, time_span, filters=None):
+    """
+    Calculate total number of adults, children, and babies per day within
+    a time span from the cube, with the same result as
+    occupancy.calculate_total_guests for the bookings of the cube.
+
+    A booking leaving on the selected date itself is not active for this
+    date, so on the first day guests leaving are subtracted.
+
+    :param df_cube: pandas data frame containing cube
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span, in which guests should arrive (in days)
+    :param filters: Dictionary of dimension column and list of values,
+                    to which the bookings are restricted (optional)
+    :return: pandas data frame with total guests per day
+    """
+
+    first_day = occupancy.to_day_numbers([pd.to_datetime(selected_date)])[0]
+    last_day = first_day + int(time_span)
+    n_days = last_day - first_day + 1
+
+    df_slice = slice_cube(df_cube, first_day, last_day, filters)
+    positions = df_slice['day'].to_numpy().astype(np.int64) - first_day
+
+    # Sum measures of all dimension values per day
+    sums = {}
+    for column in MEASURES:
+        sums[column] = np.bincount(positions, df_slice[column].to_numpy(),
+                                   minlength=n_days).round().astype(np.int64)
+
+    sums['stays'] = sums['room_nights'] + sums['departures']
+    sums['stays'][0] -= sums['departures'][0]
+
+    for column in occupancy.GUEST_COLUMNS:
+        sums[column][0] -= sums['departing_' + column][0]
+
+    return occupancy.create_total_guests_frame(
+        np.arange(first_day, last_day + 1), sums)
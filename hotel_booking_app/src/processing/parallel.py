@@ -0,0 +1,297 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Analyse several hotels in parallel"
+
+#######################################################################
+
+import io
+import os.path
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.preparation.prepare_data as prep
+import hotel_booking_app.src.preparation.schema as schema
+import hotel_booking_app.src.processing.occupancy as occupancy
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+import hotel_booking_app.settings as setting
+
+
+def get_partition_name(name):
+    """
+    Convert hotel name or file name to a name usable in file names,
+    e.g. 'Resort Hotel' to 'resort_hotel'.
+
+    :param name: Name of hotel or file
+    :return: Name of partition
+    """
+    return re.sub(r'[^a-z0-9]+', '_', str(name).lower()).strip('_')
+
+
+def analyse_bookings(df, selected_date, time_span):
+    """
+    Analyse active bookings and total guests of bookings.
+
+    :param df: pandas data frame containing bookings
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :return: Tuple of data frame of active bookings and dictionary of sums
+             per day
+    """
+
+    first_day = occupancy.to_day_numbers([pd.to_datetime(selected_date)])[0]
+    last_day = first_day + int(time_span)
+
+    df_active_bookings = BookingDataset(df).get_active_bookings(selected_date,
+                                                                time_span)
+    sums = occupancy.sum_guests_per_day(df_active_bookings, first_day,
+                                        last_day)
+
+    return df_active_bookings.drop(occupancy.DAY_COLUMNS, axis=1), sums
+
+
+def save_partition(name, df_active_bookings, sums, save_to_path,
+                   selected_date, time_span):
+    """
+    Save results of one hotel.
+
+    :param name: Name of partition
+    :param df_active_bookings: pandas data frame of active bookings
+    :param sums: Dictionary of sums per day
+    :param save_to_path: Path of result directory
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    """
+
+    first_day = occupancy.to_day_numbers([pd.to_datetime(selected_date)])[0]
+
+    df_active_bookings.to_csv(
+        os.path.join(save_to_path,
+                     setting.RESULT_ACTIVE_BOOKINGS_PER_HOTEL % name),
+        index=False)
+    occupancy.create_total_guests_frame(
+        np.arange(first_day, first_day + int(time_span) + 1), sums) \
+        .to_csv(os.path.join(save_to_path,
+                             setting.RESULT_TOTAL_GUESTS_PER_HOTEL % name),
+                index=False)
+
+
+def analyse_file(csv_file_path, name, save_to_path, selected_date,
+                 time_span, threshold, raw_save_to_path=None):
+    """
+    Prepare csv file of one hotel, analyse it and save its results.
+
+    :param csv_file_path: Path of csv file containing bookings of one hotel
+    :param name: Name of partition
+    :param save_to_path: Path of result directory
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :param threshold: Maximum NaN percentage of a column
+    :param raw_save_to_path: Path of directory of cleaned csv files, or
+                             None to not save them
+    :return: Tuple of name, data frame of active bookings and
+             dictionary of sums per day
+    """
+
+    df = prep.import_clean_data(
+        csv_file_path,
+        None if raw_save_to_path is None else
+        os.path.join(raw_save_to_path, setting.RAW_NAME_PER_HOTEL % name),
+        threshold)
+
+    df_active_bookings, sums = analyse_bookings(df, selected_date, time_span)
+    save_partition(name, df_active_bookings, sums, save_to_path,
+                   selected_date, time_span)
+
+    return name, df_active_bookings, sums
+
+
+def split_csv_file(csv_file_path, n_parts):
+    """
+    Split csv file into parts of about equal size, which end after a
+    line break, so every part can be read on its own.
+
+    :param csv_file_path: Path of csv file
+    :param n_parts: Number of parts
+    :return: Tuple of header line and list of start and end positions of
+             parts (in bytes)
+    """
+
+    size = os.path.getsize(csv_file_path)
+
+    with open(csv_file_path, 'rb') as csv_file:
+        header = csv_file.readline()
+        positions = [csv_file.tell()]
+
+        for i in range(1, n_parts):
+            csv_file.seek(max(positions[-1], positions[0]
+                              + (size - positions[0]) * i // n_parts))
+            csv_file.readline()
+            positions.append(csv_file.tell())
+
+    positions.append(size)
+
+    return header, [(start, end) for start, end in
+                    zip(positions[:-1], positions[1:]) if end > start]
+
+
+def analyse_part(csv_file_path, header, start, end, selected_date,
+                 time_span):
+    """
+    Read part of a csv file and analyse the bookings of every hotel in it.
+    Columns are not cleaned yet, as this depends on all parts.
+
+    :param csv_file_path: Path of csv file containing bookings
+    :param header: Header line of csv file
+    :param start: Start position of part (in bytes)
+    :param end: End position of part (in bytes)
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :return: Tuple of number of bookings, number of NaN values per column
+             and dictionary of name of partition and tuple of active
+             bookings and sums per day
+    """
+
+    with open(csv_file_path, 'rb') as csv_file:
+        csv_file.seek(start)
+        data = csv_file.read(end - start)
+
+    df = schema.convert_types(pd.read_csv(io.BytesIO(header + data),
+                                          **schema.read_options()))
+
+    partitions = {get_partition_name(hotel):
+                  analyse_bookings(df_hotel, selected_date, time_span)
+                  for hotel, df_hotel in df.groupby('hotel', observed=True,
+                                                    dropna=False)}
+
+    return df.shape[0], df.isnull().sum(), partitions
+
+
+def combine_parts(results, save_to_path, selected_date, time_span,
+                  threshold):
+    """
+    Combine results of all parts of a csv file per hotel and save them.
+    Columns are cleaned like prepare_data.import_clean_data cleans them.
+
+    :param results: List of results of analyse_part
+    :param save_to_path: Path of result directory
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :param threshold: Maximum NaN percentage of a column
+    :return: List of tuples of name, data frame of active bookings and
+             dictionary of sums per day
+    """
+
+    n_rows = sum(n_part_rows for n_part_rows, _, _ in results)
+    null_counts = sum(part_null_counts for _, part_null_counts, _ in results)
+
+    # Drop all columns, that have more than threshold*100 percent NaN values
+    columns = set(null_counts.index[null_counts < threshold*n_rows])
+
+    names = sorted({name for _, _, partitions in results
+                    for name in partitions})
+    combined = []
+
+    for name in names:
+        parts = [partitions[name] for _, _, partitions in results
+                 if name in partitions]
+
+        frames = [df for df, _ in parts]
+        df_active_bookings = pd.concat(
+            [df for df in frames if len(df)] or frames[:1])
+        df_active_bookings = df_active_bookings[
+            [column for column in df_active_bookings.columns
+             if column in columns]]
+
+        # Sums per day of the parts are added up
+        sums = {column: sum(part_sums[column] for _, part_sums in parts)
+                for column in parts[0][1]}
+
+        save_partition(name, df_active_bookings, sums, save_to_path,
+                       selected_date, time_span)
+        combined.append((name, df_active_bookings, sums))
+
+    return combined
+
+
+def analyse_hotels(csv_file_paths, save_to_path, selected_date, time_span,
+                   threshold=0.8, partition_by_hotel=False, processes=None,
+                   raw_save_to_path=None):
+    """
+    Prepare and analyse bookings of several hotels on a process pool.
+    Either every csv file contains the bookings of one hotel and every
+    process prepares and analyses one file, or a single csv file is split
+    into parts and every process reads and analyses one part, per value
+    of the hotel column. Only combining the results of the parts per hotel
+    runs in the calling process.
+    Results are saved per hotel and consolidated for all hotels.
+
+    :param csv_file_paths: List of paths of csv files
+    :param save_to_path: Path of result directory
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :param threshold: Maximum NaN percentage of a column
+    :param partition_by_hotel: If true, partition every csv file by the
+                               hotel column instead of analysing one csv
+                               file per hotel
+    :param processes: Number of processes, by default the number of cores
+    :param raw_save_to_path: Path of directory of cleaned csv files of
+                             every hotel, or None to not save them. Parts
+                             of a csv file are not saved.
+    :return: List of names of partitions
+    """
+
+    if partition_by_hotel and len(csv_file_paths) != 1:
+        raise ValueError('Only one csv file can be partitioned by hotel.')
+
+    names = [get_partition_name(os.path.splitext(
+        os.path.basename(csv_file_path))[0])
+        for csv_file_path in csv_file_paths]
+
+    if len(set(names)) != len(names):
+        raise ValueError('Names of csv files must be unique.')
+
+    os.makedirs(save_to_path, exist_ok=True)
+
+    with ProcessPoolExecutor(processes) as executor:
+        if partition_by_hotel:
+            # Every process reads one part of the csv file. Columns are
+            # cleaned over all parts, so all hotels keep the same columns.
+            header, parts = split_csv_file(csv_file_paths[0],
+                                           processes or os.cpu_count())
+            futures = [executor.submit(analyse_part, csv_file_paths[0],
+                                       header, start, end, selected_date,
+                                       time_span)
+                       for start, end in parts]
+
+            results = combine_parts([future.result() for future in futures],
+                                    save_to_path, selected_date, time_span,
+                                    threshold)
+        else:
+            # Every process prepares and analyses one csv file
+            futures = [executor.submit(analyse_file, csv_file_path, name,
+                                       save_to_path, selected_date, time_span,
+                                       threshold, raw_save_to_path)
+                       for csv_file_path, name in zip(csv_file_paths, names)]
+
+            results = [future.result() for future in futures]
+
+    # Consolidate results of all hotels. Sums per day are added up,
+    # as they are when a csv file is analysed chunk by chunk
+    first_day = occupancy.to_day_numbers([pd.to_datetime(selected_date)])[0]
+    sums = {column: np.zeros(int(time_span) + 1, dtype=np.int64)
+            for column in ['stays'] + occupancy.GUEST_COLUMNS}
+
+    for _, _, partition_sums in results:
+        for column, values in partition_sums.items():
+            sums[column] += values
+
+    pd.concat([df_active_bookings for _, df_active_bookings, _ in results]) \
+        .to_csv(os.path.join(save_to_path, setting.RESULT_ACTIVE_BOOKINGS),
+                index=False)
+    occupancy.create_total_guests_frame(
+        np.arange(first_day, first_day + int(time_span) + 1), sums) \
+        .to_csv(os.path.join(save_to_path, setting.RESULT_TOTAL_GUESTS),
+                index=False)
+
+    return [name for name, _, _ in results]
@@ -0,0 +1,239 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Estimate total guests from a sample of bookings"
+
+#######################################################################
+
+import io
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.preparation.schema as schema
+import hotel_booking_app.src.processing.occupancy as occupancy
+
+PREVIEW_COLUMNS = occupancy.TOTAL_GUESTS_COLUMNS \
+    + ['total_guests_lower', 'total_guests_upper']
+
+
+def sample_lines(csv_file_path, sample_size, seed=None, block_size=1 << 24):
+    """
+    Draw a uniform random sample of lines of a csv file while reading it
+    block by block (reservoir sampling).
+    Every line gets a random key, the lines with the smallest keys are
+    the sample. Lines are only split, not parsed, so a large file is
+    sampled much faster than it is read as data frame. Values must not
+    contain line breaks.
+
+    :param csv_file_path: Path of csv file
+    :param sample_size: Maximum number of sampled lines
+    :param seed: Seed of random numbers (optional)
+    :param block_size: Number of bytes read at once
+    :return: Tuple of header line, list of sampled lines and number of
+             lines of the file (without header)
+    :raises ValueError: If sample size is smaller than 1
+    """
+
+    # The largest key of a full sample is only defined for at least one line
+    if sample_size < 1:
+        raise ValueError('Sample size must be at least 1, not %s.'
+                         % sample_size)
+
+    random = np.random.default_rng(seed)
+    keys = np.empty(0)
+    lines = []
+    n_lines = 0
+
+    with open(csv_file_path, 'rb') as csv_file:
+        header = csv_file.readline()
+        rest = b''
+
+        for block in iter(lambda: csv_file.read(block_size), b''):
+            block = rest + block
+
+            # Lines end after every line break
+            ends = np.flatnonzero(np.frombuffer(block, dtype=np.uint8)
+                                  == ord('\n')) + 1
+            starts = np.concatenate([[0], ends[:-1]])
+            rest = block[ends[-1]:] if len(ends) else block
+
+            keys, lines, n_lines = add_to_sample(
+                block, starts, ends, keys, lines, n_lines, sample_size,
+                random)
+
+        # Last line without line break
+        if rest:
+            keys, lines, n_lines = add_to_sample(
+                rest, np.array([0]), np.array([len(rest)]), keys, lines,
+                n_lines, sample_size, random)
+
+    return header, lines, n_lines
+
+
+def add_to_sample(block, starts, ends, keys, lines, n_lines, sample_size,
+                  random):
+    """
+    Add lines of a block to the sample, if their random key is smaller
+    than the largest key of the sample.
+
+    :param block: Bytes of block
+    :param starts: Integer array of start positions of lines
+    :param ends: Integer array of end positions of lines
+    :param keys: Float array of keys of sampled lines
+    :param lines: List of sampled lines
+    :param n_lines: Number of lines before the block
+    :param sample_size: Maximum number of sampled lines
+    :param random: numpy.random.Generator
+    :return: Tuple of keys, sampled lines and number of lines including
+             the block
+    """
+
+    # Empty lines, also with Windows line breaks, are no bookings
+    lengths = ends - starts
+    empty = lengths <= 1
+    empty[lengths == 2] = np.frombuffer(block, dtype=np.uint8)[
+        starts[lengths == 2]] == ord('\r')
+    starts = starts[~empty]
+    ends = ends[~empty]
+
+    block_keys = random.random(len(starts))
+    threshold = np.max(keys) if len(keys) >= sample_size else 1.0
+    chosen = np.flatnonzero(block_keys < threshold)
+
+    keys = np.concatenate([keys, block_keys[chosen]])
+    lines = lines + [block[starts[i]:ends[i]] for i in chosen]
+
+    # Keep lines with the smallest keys
+    if len(keys) > sample_size:
+        kept = np.argpartition(keys, sample_size)[:sample_size]
+        keys = keys[kept]
+        lines = [lines[i] for i in kept]
+
+    return keys, lines, n_lines + len(starts)
+
+
+def read_sample(csv_file_path, sample_size, seed=None):
+    """
+    Read a uniform random sample of bookings of a csv file.
+    Only columns needed for total guests are parsed.
+
+    :param csv_file_path: Path of csv file containing bookings
+    :param sample_size: Maximum number of sampled bookings
+    :param seed: Seed of random numbers (optional)
+    :return: Tuple of pandas data frame containing sampled bookings and
+             number of bookings of the file
+    """
+
+    header, lines, n_bookings = sample_lines(csv_file_path, sample_size,
+                                             seed)
+
+    # Lines without line break are completed before they are joined
+    df_sample = pd.read_csv(
+        io.BytesIO(header + b''.join(line if line.endswith(b'\n')
+                                     else line + b'\n'
+                                     for line in lines)),
+        **schema.read_options(schema.OCCUPANCY_COLUMNS))
+
+    return schema.convert_types(df_sample), n_bookings
+
+
+def estimate_total_guests(df_sample, n_bookings, selected_date, time_span,
+                          confidence=0.95):
+    """
+    Estimate total number of adults, children, and babies per day within
+    a time span from a uniform random sample of bookings.
+
+    Totals are estimated as the mean per sampled booking multiplied by the
+    number of bookings. Confidence intervals use the normal approximation
+    with finite population correction, so they have no width, if all
+    bookings are sampled.
+
+    :param df_sample: pandas data frame containing sampled bookings
+    :param n_bookings: Number of bookings the sample was drawn from
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span, in which guests should arrive (in days)
+    :param confidence: Confidence level of intervals
+    :return: pandas data frame with estimated total guests per day and
+             lower and upper bound of total guests
+    """
+
+    n_sample = len(df_sample)
+
+    if n_sample == 0:
+        return pd.DataFrame(columns=PREVIEW_COLUMNS)
+
+    first_day = occupancy.to_day_numbers([pd.to_datetime(selected_date)])[0]
+    last_day = first_day + int(time_span)
+
+    n_days = last_day - first_day + 1
+
+    # Cancelled bookings and bookings outside of the time span do not
+    # count, but they are part of the sample.
+    # Day positions are relative to the first day of the time span.
+    arrival_days, leaving_days = occupancy.get_stay_days(df_sample)
+    start = np.maximum(arrival_days, first_day) - first_day
+    end = np.minimum(leaving_days, last_day) - first_day
+    in_window = (df_sample['is_canceled'].to_numpy() == 0) \
+        & (leaving_days > first_day) & (start <= end)
+    start = start[in_window]
+    end = end[in_window]
+
+    guests = {column: df_sample[column].fillna(0).to_numpy()
+              .astype(np.int64)[in_window]
+              for column in occupancy.GUEST_COLUMNS}
+    guests['total_guests_per_day'] = sum(guests.values())
+
+    stays = occupancy.sum_per_day(start, end, np.ones(len(start)), n_days)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    estimates = {}
+    for column, values in guests.items():
+        # Mean and variance of guests per sampled booking and day
+        mean = occupancy.sum_per_day(start, end, values, n_days) / n_sample
+        variance = (occupancy.sum_per_day(start, end, values ** 2, n_days)
+                    - n_sample * mean ** 2) / max(n_sample - 1, 1)
+        standard_error = n_bookings * np.sqrt(
+            np.maximum(variance, 0) / n_sample
+            * max(1 - n_sample / n_bookings, 0))
+
+        estimates[column] = n_bookings * mean
+
+        if column == 'total_guests_per_day':
+            estimates['total_guests_lower'] = np.maximum(
+                estimates[column] - z * standard_error, 0)
+            estimates['total_guests_upper'] = \
+                estimates[column] + z * standard_error
+
+    # Only days on which at least one sampled booking stays are estimated
+    occupied = stays > 0
+
+    df_preview = pd.DataFrame({'stayed_date': pd.to_datetime(
+        np.arange(first_day, last_day + 1)[occupied]
+        .astype('datetime64[D]'))})
+
+    for column in PREVIEW_COLUMNS[1:]:
+        df_preview[column] = estimates[column][occupied].round() \
+            .astype(np.int64)
+
+    return df_preview
+
+
+def preview_total_guests(csv_file_path, selected_date, time_span,
+                         sample_size, confidence=0.95, seed=None):
+    """
+    Estimate total guests per day within a time span from a sample of
+    the bookings of a csv file.
+
+    :param csv_file_path: Path of csv file containing bookings
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span, in which guests should arrive (in days)
+    :param sample_size: Maximum number of sampled bookings
+    :param confidence: Confidence level of intervals
+    :param seed: Seed of random numbers (optional)
+    :return: pandas data frame with estimated total guests per day and
+             lower and upper bound of total guests
+    """
+
+    df_sample, n_bookings = read_sample(csv_file_path, sample_size, seed)
+
+    return estimate_total_guests(df_sample, n_bookings, selected_date,
+                                 time_span, confidence)
@@ -0,0 +1,78 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Analyse hotel bookings chunk by chunk"
+
+#######################################################################
+
+import numpy as np
+import pandas as pd
+import hotel_booking_app.src.preparation.prepare_data as prep
+import hotel_booking_app.src.processing.occupancy as occupancy
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+
+
+def analyse_bookings_in_chunks(csv_file_path, raw_save_to_path,
+                               active_bookings_save_to_path,
+                               total_guests_save_to_path,
+                               selected_date, time_span, threshold,
+                               chunk_size):
+    """
+    Prepare csv file and analyse active bookings and total guests per day
+    chunk by chunk, for csv files that do not fit into memory.
+    Peak memory depends on the chunk size instead of the file size.
+
+    :param csv_file_path: Path of csv file containing relevant data
+    :param raw_save_to_path: Path of cleaned csv file, or None to not save
+                             the cleaned data
+    :param active_bookings_save_to_path: Path of active bookings result
+                                         csv file
+    :param total_guests_save_to_path: Path of total guests result csv file
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :param threshold: Decimal value, representing the maximum NaN percentage
+                      of a row. If a row has more NaN values than the threshold,
+                      it will be dropped.
+    :param chunk_size: Number of rows per chunk
+    """
+
+    selected_date = pd.to_datetime(selected_date)
+    first_day = occupancy.to_day_numbers([selected_date])[0]
+    last_day = first_day + int(time_span)
+
+    sums = {column: np.zeros(last_day - first_day + 1, dtype=np.int64)
+            for column in ['stays'] + occupancy.GUEST_COLUMNS}
+
+    for i, df in enumerate(prep.read_clean_data_in_chunks(csv_file_path,
+                                                          threshold,
+                                                          chunk_size)):
+        # Write header with first chunk only and append following chunks
+        write_options = {'index': False,
+                         'header': i == 0,
+                         'mode': 'w' if i == 0 else 'a'}
+
+        if raw_save_to_path is not None:
+            df.to_csv(raw_save_to_path, **write_options)
+
+        df = BookingDataset.normalize(df)
+
+        # Get all bookings where ->
+        # leaving date is not earlier than current date
+        # and arrival date is not later than selected date plus time_span days
+        # and the booking is not cancelled
+        df_active_bookings = df.loc[
+            ~((df['leaving_day'] <= first_day)
+              | (df['arrival_day'] > last_day))
+            & (df['is_canceled'] == 0)]
+
+        df_active_bookings.drop(occupancy.DAY_COLUMNS, axis=1) \
+            .to_csv(active_bookings_save_to_path, **write_options)
+
+        # Add guests per day of chunk to total guests per day
+        for column, values in occupancy.sum_guests_per_day(
+                df_active_bookings, first_day, last_day).items():
+            sums[column] += values
+
+    # Save total guests per day of all chunks to results
+    occupancy.create_total_guests_frame(np.arange(first_day, last_day + 1),
+                                        sums) \
+        .to_csv(total_guests_save_to_path, index=False)
@@ -0,0 +1,50 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Validate query parameters"
+
+#######################################################################
+
+# Only the standard library is used, so the command line interface can
+# import this module without slowing down its startup.
+
+
+def parse_span(value):
+    """
+    Parse time span of a query.
+
+    :param value: Time span in days
+    :return: Time span as integer
+    :raises ValueError: If time span is not a non-negative integer
+    """
+
+    try:
+        time_span = int(value)
+    except ValueError:
+        time_span = -1
+
+    if time_span < 0:
+        raise ValueError('Time span must be a non-negative number of days, '
+                         'not %s.' % value)
+
+    return time_span
+
+
+def parse_sample_size(value):
+    """
+    Parse sample size of a preview.
+
+    :param value: Number of sampled bookings
+    :return: Sample size as integer
+    :raises ValueError: If sample size is not a positive integer
+    """
+
+    try:
+        sample_size = int(value)
+    except ValueError:
+        sample_size = 0
+
+    if sample_size < 1:
+        raise ValueError('Sample size must be a positive number of '
+                         'bookings, not %s.' % value)
+
+    return sample_size
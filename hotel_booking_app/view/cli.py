@@ -0,0 +1,686 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Command line interface of application"
+
+#######################################################################
+
+# Only lightweight modules are imported here, so that showing the help
+# is fast. Analysis modules (and with them pandas) are imported when a
+# command is run. tkinter is never imported.
+import argparse
+import datetime as dt
+import os.path
+import sys
+import hotel_booking_app.settings as setting
+import hotel_booking_app.src.export as export
+import hotel_booking_app.src.validation as validation
+
+
+def parse_date(value):
+    """
+    Parse date argument.
+
+    :param value: Date in YYYY-MM-DD format
+    :return: Date in YYYY-MM-DD format
+    """
+
+    try:
+        return dt.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            'Date is not valid. The format should be YYYY-MM-DD.')
+
+
+def parse_span(value):
+    """
+    Parse time span argument.
+
+    :param value: Time span in days
+    :return: Time span as integer
+    """
+
+    try:
+        return validation.parse_span(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def parse_sample_size(value):
+    """
+    Parse sample size argument.
+
+    :param value: Number of sampled bookings
+    :return: Sample size as integer
+    """
+
+    try:
+        return validation.parse_sample_size(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def create_parser():
+    """
+    Create parser of command line arguments.
+
+    :return: argparse.ArgumentParser
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='hotel_booking_app',
+        description='Explore hotel booking data and provide reports on '
+                    'upcoming bookings.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # Arguments shared by all commands
+    parser_common = argparse.ArgumentParser(add_help=False)
+    parser_common.add_argument('csv_path',
+                               help='Path of csv file containing bookings')
+    parser_common.add_argument('--threshold', type=float, default=0.8,
+                               help='Maximum NaN percentage of a column')
+    parser_common.add_argument('--no-cache', action='store_true',
+                               help='Do not use cache of prepared data')
+    parser_common.add_argument('--metrics', metavar='PATH',
+                               help='Append duration, rows and memory of '
+                                    'every step to this JSON lines file')
+    parser_common.add_argument('--trace-memory', action='store_true',
+                               help='Measure peak memory of every step '
+                                    '(slows down processing)')
+
+    # Prepare data
+    parser_prepare = subparsers.add_parser(
+        'prepare', parents=[parser_common],
+        help='Import and clean csv file.')
+    parser_prepare.add_argument('--output',
+                                default=os.path.join(setting.RAW_DATA_PATH,
+                                                     setting.RAW_NAME),
+                                help='Path of cleaned csv file')
+    parser_prepare.add_argument('--cube', nargs='?', metavar='DIRECTORY',
+                                const=setting.CUBE_DATA_PATH,
+                                help='Save daily occupancy cube to this '
+                                     'directory')
+    parser_prepare.set_defaults(run=run_prepare)
+
+    # Analyse active bookings and total guests for one date
+    parser_analyse = subparsers.add_parser(
+        'analyse', parents=[parser_common],
+        help='Analyse active bookings and total guests per day.')
+    parser_analyse.add_argument('--date', type=parse_date, required=True,
+                                help='Selected date (YYYY-MM-DD)')
+    parser_analyse.add_argument('--span', type=parse_span, default=7,
+                                help='Time span in days')
+    parser_analyse.add_argument('--output-dir',
+                                default=setting.RESULT_DATA_PATH,
+                                help='Directory of result csv files')
+    parser_analyse.add_argument('--format', default='csv',
+                                choices=export.FORMATS,
+                                help='Format of result files')
+    parser_analyse.add_argument('--chunk-size', type=int,
+                                help='Analyse csv file chunk by chunk with '
+                                     'this number of rows per chunk')
+    parser_analyse.set_defaults(run=run_analyse)
+
+    # Estimate total guests from a sample of bookings
+    parser_preview = subparsers.add_parser(
+        'preview',
+        help='Estimate total guests per day with confidence intervals from '
+             'a random sample of bookings, without preparing the csv file.')
+    parser_preview.add_argument('csv_path',
+                                help='Path of csv file containing bookings')
+    parser_preview.add_argument('--date', type=parse_date, required=True,
+                                help='Selected date (YYYY-MM-DD)')
+    parser_preview.add_argument('--span', type=parse_span, default=7,
+                                help='Time span in days')
+    parser_preview.add_argument('--sample-size', type=parse_sample_size,
+                                default=setting.PREVIEW_SAMPLE_SIZE,
+                                help='Number of sampled bookings')
+    parser_preview.add_argument('--confidence', type=float,
+                                default=setting.PREVIEW_CONFIDENCE,
+                                help='Confidence level of intervals')
+    parser_preview.add_argument('--seed', type=int,
+                                help='Seed of random sample')
+    parser_preview.add_argument('--output-dir',
+                                default=setting.RESULT_DATA_PATH,
+                                help='Directory of result csv file')
+    parser_preview.set_defaults(run=run_preview, metrics=None,
+                                trace_memory=False)
+
+    # Analyse several hotels in parallel
+    parser_hotels = subparsers.add_parser(
+        'hotels',
+        help='Analyse active bookings and total guests of several hotels '
+             'in parallel, either one csv file per hotel or one csv file '
+             'partitioned by hotel.')
+    parser_hotels.add_argument('csv_paths', nargs='+',
+                               help='Paths of csv files containing bookings')
+    parser_hotels.add_argument('--threshold', type=float, default=0.8,
+                               help='Maximum NaN percentage of a column')
+    parser_hotels.add_argument('--by-hotel', action='store_true',
+                               help='Partition one csv file by the hotel '
+                                    'column')
+    parser_hotels.add_argument('--date', type=parse_date, required=True,
+                               help='Selected date (YYYY-MM-DD)')
+    parser_hotels.add_argument('--span', type=parse_span, default=7,
+                               help='Time span in days')
+    parser_hotels.add_argument('--output-dir',
+                               default=setting.RESULT_DATA_PATH,
+                               help='Directory of result csv files')
+    parser_hotels.add_argument('--processes', type=int,
+                               help='Number of processes, by default the '
+                                    'number of cores')
+    parser_hotels.set_defaults(run=run_hotels, metrics=None,
+                               trace_memory=False)
+
+    # Analyse several measures per day
+    parser_daily = subparsers.add_parser(
+        'daily', parents=[parser_common],
+        help='Calculate guests, room nights, arrivals, departures and '
+             'revenue per day in one pass, optionally per hotel or market '
+             'segment.')
+    parser_daily.add_argument('--date', type=parse_date, required=True,
+                              help='Selected date (YYYY-MM-DD)')
+    parser_daily.add_argument('--span', type=parse_span, default=7,
+                              help='Time span in days')
+    parser_daily.add_argument('--measures', nargs='+',
+                              help='Measures per day, e.g. total_guests '
+                                   'room_nights revenue arrivals departures '
+                                   '(default: all)')
+    parser_daily.add_argument('--by', nargs='+', default=[],
+                              metavar='COLUMN',
+                              help='Calculate measures per value of these '
+                                   'columns, e.g. hotel market_segment')
+    parser_daily.add_argument('--output-dir',
+                              default=setting.RESULT_DATA_PATH,
+                              help='Directory of result csv file')
+    parser_daily.set_defaults(run=run_daily)
+
+    # Query total guests from the daily occupancy cube
+    parser_occupancy = subparsers.add_parser(
+        'occupancy',
+        help='Calculate total guests per day from the daily occupancy cube '
+             'saved by prepare --cube, without reading bookings.')
+    parser_occupancy.add_argument('--cube', metavar='DIRECTORY',
+                                  default=setting.CUBE_DATA_PATH,
+                                  help='Directory of cube')
+    parser_occupancy.add_argument('--date', type=parse_date, required=True,
+                                  help='Selected date (YYYY-MM-DD)')
+    parser_occupancy.add_argument('--span', type=parse_span, default=7,
+                                  help='Time span in days')
+    parser_occupancy.add_argument('--hotel', nargs='+',
+                                  help='Only include these hotels')
+    parser_occupancy.add_argument('--room-type', nargs='+',
+                                  help='Only include these assigned room '
+                                       'types')
+    parser_occupancy.add_argument('--output-dir',
+                                  default=setting.RESULT_DATA_PATH,
+                                  help='Directory of result csv file')
+    parser_occupancy.set_defaults(run=run_occupancy, metrics=None,
+                                  trace_memory=False)
+
+    # Forecast total guests for several dates
+    parser_forecast = subparsers.add_parser(
+        'forecast', parents=[parser_common],
+        help='Calculate total guests per day for several selected dates.')
+    parser_forecast.add_argument('--dates', nargs='+', type=parse_date,
+                                 default=[],
+                                 help='Selected dates (YYYY-MM-DD)')
+    parser_forecast.add_argument('--start', type=parse_date,
+                                 help='First selected date of a date range')
+    parser_forecast.add_argument('--end', type=parse_date,
+                                 help='Last selected date of a date range')
+    parser_forecast.add_argument('--spans', nargs='+', type=parse_span,
+                                 default=[7],
+                                 help='Time span in days, either one for all '
+                                      'dates or one per date')
+    parser_forecast.add_argument('--output-dir',
+                                 default=setting.RESULT_DATA_PATH,
+                                 help='Directory of result csv files')
+    parser_forecast.add_argument('--per-date', action='store_true',
+                                 help='Write one result csv file per date')
+    parser_forecast.set_defaults(run=run_forecast, parser=parser_forecast)
+
+    # Serve queries of active bookings and total guests on localhost
+    parser_serve = subparsers.add_parser(
+        'serve', parents=[parser_common],
+        help='Serve active bookings and total guests queries as JSON on '
+             'localhost.')
+    parser_serve.add_argument('--port', type=int, default=8000,
+                              help='Port of service')
+    parser_serve.add_argument('--cache-size', type=int, default=256,
+                              help='Maximum number of cached query results')
+    parser_serve.set_defaults(run=run_serve)
+
+    # Update stored bookings with a delta file
+    parser_update = subparsers.add_parser(
+        'update', parents=[parser_common],
+        help='Apply a delta file of new, changed and cancelled bookings. '
+             'The first file creates the store of all bookings.')
+    parser_update.add_argument('--store',
+                               default=setting.INCREMENTAL_DATA_PATH,
+                               help='Directory of stored bookings')
+    parser_update.add_argument('--key', nargs='+',
+                               default=setting.BOOKING_KEY_COLUMNS,
+                               help='Columns identifying a booking '
+                                    '(default: booking key hashed from '
+                                    'the columns, which do not change)')
+    parser_update.add_argument('--output-dir',
+                               default=setting.RESULT_DATA_PATH,
+                               help='Directory of result csv files')
+    parser_update.set_defaults(run=run_update)
+
+    # Report duplicated bookings and remove them
+    parser_duplicates = subparsers.add_parser(
+        'duplicates', parents=[parser_common],
+        help='Report bookings occurring more than once or already '
+             'contained in files uploaded before.')
+    parser_duplicates.add_argument('--key', nargs='+',
+                                   default=setting.BOOKING_IDENTITY_COLUMNS,
+                                   help='Columns identifying a booking '
+                                        '(default: all columns)')
+    parser_duplicates.add_argument('--known', nargs='+', default=[],
+                                   metavar='CSV_PATH',
+                                   help='Cleaned csv files of bookings '
+                                        'uploaded before')
+    parser_duplicates.add_argument('--output-dir',
+                                   default=setting.RESULT_DATA_PATH,
+                                   help='Directory of report csv file')
+    parser_duplicates.add_argument('--deduplicated', metavar='PATH',
+                                   help='Save new unique bookings to this '
+                                        'csv file')
+    parser_duplicates.set_defaults(run=run_duplicates)
+
+    return parser
+
+
+def create_data_cache(args):
+    """
+    Create cache of prepared data, unless it is disabled.
+
+    :param args: Parsed command line arguments
+    :return: DataCache or None
+    """
+
+    if args.no_cache:
+        return None
+
+    from hotel_booking_app.src.preparation.data_cache import DataCache
+
+    return DataCache(setting.CACHE_DATA_PATH, setting.CACHE_SIZE_LIMIT)
+
+
+def create_instrumentation(args):
+    """
+    Create instrumentation of processing steps, if metrics are saved or
+    memory is traced.
+
+    :param args: Parsed command line arguments
+    :return: Instrumentation or None
+    """
+
+    if not args.metrics and not args.trace_memory:
+        return None
+
+    from hotel_booking_app.src.instrumentation import Instrumentation
+
+    return Instrumentation(args.metrics, trace_memory=args.trace_memory)
+
+
+def load_dataset(args, raw_save_to_path=None, cube_save_to_path=None):
+    """
+    Import and clean csv file and load it as booking dataset.
+
+    :param args: Parsed command line arguments
+    :param raw_save_to_path: Path of cleaned csv file, or None to not save
+                             the cleaned data
+    :param cube_save_to_path: Path of cube directory (optional)
+    :return: BookingDataset
+    """
+
+    import hotel_booking_app.src.preparation.prepare_data as prep
+    from hotel_booking_app.src.instrumentation import step
+    from hotel_booking_app.src.processing.booking_dataset import \
+        BookingDataset
+
+    df = prep.import_clean_data(
+        args.csv_path,
+        raw_save_to_path,
+        args.threshold,
+        create_data_cache(args),
+        args.instrumentation,
+        cube_save_to_path)
+
+    with step(args.instrumentation, 'derive_dates', df.shape[0]) as measured:
+        dataset = BookingDataset(df)
+        measured.rows_out = dataset.data.shape[0]
+
+    return dataset
+
+
+def run_prepare(args):
+    """
+    Import, clean and save csv file.
+
+    :param args: Parsed command line arguments
+    """
+
+    load_dataset(args, args.output, args.cube)
+
+
+def run_analyse(args):
+    """
+    Prepare csv file and analyse active bookings and total guests.
+
+    :param args: Parsed command line arguments
+    """
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    active_bookings_save_to_path = export.get_export_path(
+        os.path.join(args.output_dir, setting.RESULT_ACTIVE_BOOKINGS),
+        args.format)
+    total_guests_save_to_path = export.get_export_path(
+        os.path.join(args.output_dir, setting.RESULT_TOTAL_GUESTS),
+        args.format)
+
+    if args.chunk_size:
+        # Chunks are appended to the result file
+        if args.format != 'csv':
+            raise SystemExit('Files analysed chunk by chunk can only be '
+                             'saved as csv files.')
+
+        from hotel_booking_app.src.processing.streaming import \
+            analyse_bookings_in_chunks
+
+        # The cleaned data is not saved, since nothing reads it afterwards
+        analyse_bookings_in_chunks(
+            args.csv_path,
+            None,
+            active_bookings_save_to_path,
+            total_guests_save_to_path,
+            args.date, args.span, args.threshold, args.chunk_size)
+        return
+
+    import hotel_booking_app.src.processing.analyse_data as analyse
+
+    dataset = load_dataset(args)
+
+    # Active bookings are saved, while total guests are analysed.
+    # Saving parquet files fails, if no parquet engine is installed
+    try:
+        with export.ResultExporter(args.instrumentation) as exporter:
+            analyse.analyse_active_bookings(
+                dataset, active_bookings_save_to_path, args.date, args.span,
+                args.instrumentation, exporter)
+            analyse.analyse_total_guests(
+                dataset, total_guests_save_to_path, args.date, args.span,
+                args.instrumentation, exporter)
+    except ImportError as error:
+        raise SystemExit(str(error))
+
+
+def run_daily(args):
+    """
+    Prepare csv file and calculate several measures per day.
+
+    :param args: Parsed command line arguments
+    """
+
+    import hotel_booking_app.src.processing.analyse_data as analyse
+
+    dataset = load_dataset(args)
+
+    missing_columns = set(args.by) - set(dataset.data.columns)
+    if missing_columns:
+        raise SystemExit('Bookings have no column %s'
+                         % ', '.join(sorted(missing_columns)))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    try:
+        analyse.analyse_daily_measures(
+            dataset,
+            os.path.join(args.output_dir, setting.RESULT_DAILY_MEASURES),
+            args.date, args.span, args.measures, args.by,
+            args.instrumentation)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+
+def run_preview(args):
+    """
+    Estimate total guests per day from a sample of bookings.
+
+    :param args: Parsed command line arguments
+    """
+
+    from hotel_booking_app.src.processing.preview import \
+        preview_total_guests
+
+    df_preview = preview_total_guests(args.csv_path, args.date, args.span,
+                                      args.sample_size, args.confidence,
+                                      args.seed)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    df_preview.to_csv(os.path.join(args.output_dir,
+                                   setting.RESULT_TOTAL_GUESTS_PREVIEW),
+                      index=False)
+
+
+def run_hotels(args):
+    """
+    Prepare and analyse csv files of several hotels in parallel.
+
+    :param args: Parsed command line arguments
+    """
+
+    from hotel_booking_app.src.processing.parallel import analyse_hotels
+
+    try:
+        analyse_hotels(args.csv_paths, args.output_dir, args.date, args.span,
+                       args.threshold, args.by_hotel, args.processes)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+
+def run_occupancy(args):
+    """
+    Calculate total guests per day from the daily occupancy cube.
+
+    :param args: Parsed command line arguments
+    """
+
+    import hotel_booking_app.src.processing.occupancy_cube as occupancy_cube
+
+    if not os.path.isdir(args.cube):
+        raise SystemExit('No cube found in %s. Create it with prepare --cube.'
+                         % args.cube)
+
+    filters = {}
+    if args.hotel:
+        filters['hotel'] = args.hotel
+    if args.room_type:
+        filters['assigned_room_type'] = args.room_type
+
+    try:
+        df_total_guests = occupancy_cube.query_total_guests(
+            occupancy_cube.read_cube(args.cube), args.date, args.span,
+            filters)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    df_total_guests.to_csv(os.path.join(args.output_dir,
+                                        setting.RESULT_TOTAL_GUESTS),
+                           index=False)
+
+
+def run_forecast(args):
+    """
+    Prepare csv file and calculate total guests for all selected dates.
+
+    :param args: Parsed command line arguments
+    """
+
+    import pandas as pd
+    import hotel_booking_app.src.processing.analyse_data as analyse
+
+    if bool(args.start) != bool(args.end):
+        args.parser.error('--start and --end must be given together')
+
+    selected_dates = list(pd.to_datetime(args.dates))
+    if args.start and args.end:
+        selected_dates += list(pd.date_range(args.start, args.end, freq='D'))
+
+    if not selected_dates:
+        args.parser.error('Please provide --dates or --start and --end.')
+
+    if len(args.spans) not in (1, len(selected_dates)):
+        raise SystemExit('Please provide one time span or one per date.')
+
+    # Every date is analysed once, with its first time span
+    is_first = ~pd.Index(selected_dates).duplicated()
+    selected_dates = [date for date, first in zip(selected_dates, is_first)
+                      if first]
+    spans = [span for span, first in zip(args.spans, is_first) if first] \
+        if len(args.spans) > 1 else args.spans[0]
+
+    dataset = load_dataset(args)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.per_date:
+        save_to_path = args.output_dir
+    else:
+        save_to_path = os.path.join(args.output_dir,
+                                    setting.RESULT_TOTAL_GUESTS_FORECAST)
+
+    analyse.analyse_total_guests_forecast(dataset, save_to_path,
+                                          selected_dates, spans,
+                                          args.per_date,
+                                          args.instrumentation)
+
+
+def run_serve(args):
+    """
+    Run local query service.
+
+    :param args: Parsed command line arguments
+    """
+
+    from hotel_booking_app.view.service import serve
+
+    serve(args.csv_path, args.port, args.threshold, args.cache_size,
+          create_data_cache(args))
+
+
+def run_update(args):
+    """
+    Create store of bookings or apply delta file to it and save total
+    guests of affected days.
+
+    :param args: Parsed command line arguments
+    """
+
+    import pandas as pd
+    import hotel_booking_app.src.preparation.schema as schema
+    from hotel_booking_app.src.processing.incremental import \
+        IncrementalStore
+
+    if not IncrementalStore.exists(args.store):
+        import hotel_booking_app.src.preparation.prepare_data as prep
+
+        df = prep.import_clean_data(
+            args.csv_path,
+            None,
+            args.threshold,
+            create_data_cache(args),
+            args.instrumentation)
+
+        try:
+            IncrementalStore.create(args.store, df, args.key,
+                                    setting.INCREMENTAL_COMPACT_RATIO)
+        except ValueError as error:
+            raise SystemExit(str(error))
+        return
+
+    try:
+        df_changes = IncrementalStore(
+            args.store, setting.INCREMENTAL_COMPACT_RATIO).apply_delta(
+            schema.convert_types(
+                pd.read_csv(args.csv_path,
+                            **schema.read_options(nullable=True)),
+                nullable=True))
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    df_changes.to_csv(os.path.join(args.output_dir,
+                                   setting.RESULT_OCCUPANCY_CHANGES),
+                      index=False)
+
+
+def run_duplicates(args):
+    """
+    Prepare csv file, save report of duplicated bookings and optionally
+    save new unique bookings.
+
+    :param args: Parsed command line arguments
+    """
+
+    import numpy as np
+    import pandas as pd
+    import hotel_booking_app.src.preparation.prepare_data as prep
+    import hotel_booking_app.src.preparation.identity as identity
+    import hotel_booking_app.src.preparation.schema as schema
+
+    df = prep.import_clean_data(
+        args.csv_path,
+        None,
+        args.threshold,
+        create_data_cache(args),
+        args.instrumentation)
+
+    # Keys of bookings uploaded before are hashed over the same columns
+    key_columns = args.key or list(df.columns)
+    known_keys = [np.empty(0, dtype=np.uint64)]
+
+    try:
+        for known_path in args.known:
+            df_known = schema.convert_types(
+                pd.read_csv(known_path, **schema.read_options(key_columns)))
+            known_keys.append(
+                identity.get_booking_keys(df_known, key_columns).to_numpy())
+
+        known_keys = np.concatenate(known_keys)
+        df_duplicates = identity.find_duplicates(df, key_columns,
+                                                 known_keys)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    df_duplicates.to_csv(os.path.join(args.output_dir,
+                                      setting.RESULT_DUPLICATE_BOOKINGS),
+                         index=False)
+
+    print('%d duplicated bookings, %d already known bookings'
+          % ((df_duplicates['occurrences'] > 1).sum(),
+             df_duplicates['known'].sum()))
+
+    if args.deduplicated:
+        identity.deduplicate(df, key_columns, known_keys) \
+            .to_csv(args.deduplicated, index=False)
+
+
+def main(argv=None):
+    """
+    Run command line interface.
+
+    :param argv: List of command line arguments
+    """
+
+    args = create_parser().parse_args(argv)
+    args.instrumentation = create_instrumentation(args)
+    args.run(args)
+
+    # Show timing breakdown of measured steps
+    if args.instrumentation is not None and args.instrumentation.records:
+        print(args.instrumentation.summary(), file=sys.stderr)
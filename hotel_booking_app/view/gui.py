@@ -4,18 +4,27 @@ __program__ = "Create user interface of application"
 
 #######################################################################
 
-import csv
 import tkinter as tk
 import tkinter.ttk as ttk
 from tkinter import messagebox
 from tkinter.filedialog import askopenfilename
 import re
-import hotel_booking_app.src.processing.analyse_data as analyse
-import hotel_booking_app.src.preparation.prepare_data as prep
+import multiprocessing
+import queue
+import hotel_booking_app.view.worker as worker
+from hotel_booking_app.src.instrumentation import format_summary
+from hotel_booking_app.view.virtual_table import VirtualTable
 import hotel_booking_app.settings as setting
-import os.path
 import logging
 
+# Error messages shown, if a stage of the analysis fails
+STAGE_ERROR_MESSAGES = {
+    'import': 'There has been an error during preparing the data.'
+              ' Please try again.',
+    'active_bookings': 'Active bookings could not be analysed.',
+    'total_guests': 'Total guests could not be analysed.',
+    'export': 'Results could not be saved.'}
+
 
 class HotelBookingGUI:
     """
@@ -42,6 +51,13 @@ class HotelBookingGUI:
         self.btn_analyse = tk.Button()
         self.table_active_bookings = tk.Frame()
         self.table_total_guests = tk.Frame()
+        self.progress_bar = None
+        self.lbl_status = tk.Label()
+        self.lbl_metrics = tk.Label()
+        self.metrics = []
+        self.btn_cancel = tk.Button()
+        self.worker_process = None
+        self.worker_queue = None
 
         self.load_view()
 
@@ -61,14 +77,14 @@ class HotelBookingGUI:
         self.master.title('Hotel Bookings Reporting')
 
         # Define header of content
-        self.lbl_header = tk.Label(root,
+        self.lbl_header = tk.Label(self.master,
                                    text='Welcome to the Hotel Bookings '
                                         'Reporting analysis application!',
                                    font=("Calibri", 20, 'bold')) \
             .pack(side=tk.TOP, pady=10)
 
         # Add label for description of application
-        self.lbl_description_date = tk.Label(root,
+        self.lbl_description_date = tk.Label(self.master,
                                              text='After entering a date and '
                                                   'providing a CSV file, please'
                                                   ' click on the button'
@@ -78,19 +94,19 @@ class HotelBookingGUI:
             .pack(side=tk.TOP, pady=10)
 
         # Define container for tables
-        self.table_container = tk.Frame(root).pack(side=tk.TOP)
+        self.table_container = tk.Frame(self.master).pack(side=tk.TOP)
 
         # Date input
-        self.lbl_date = tk.Label(root,
+        self.lbl_date = tk.Label(self.master,
                                  text='Input a date (YYYY-MM-DD):',
                                  font=("Calibri", 12, 'bold')) \
             .pack(side=tk.TOP)
 
-        self.entry_date = tk.Entry(root, textvariable=self.date) \
+        self.entry_date = tk.Entry(self.master, textvariable=self.date) \
             .pack(side=tk.TOP)
 
         # Explanation for uploading csv file
-        self.lbl_description_csv = tk.Label(root,
+        self.lbl_description_csv = tk.Label(self.master,
                                             text="Upload a CSV file on "
                                                  "which the analysis should be"
                                                  " performed on.",
@@ -98,94 +114,73 @@ class HotelBookingGUI:
             .pack(side=tk.TOP, pady=10)
 
         # File input
-        self.btn_browse = tk.Button(root,
+        self.btn_browse = tk.Button(self.master,
                                     text='Browse for CSV file',
                                     command=self.import_csv_data,
                                     font=("Calibri", 12)) \
             .pack(side=tk.TOP)
 
         # Label for displaying path of file
-        self.lbl_file_path = tk.Label(root, text='File path:',
+        self.lbl_file_path = tk.Label(self.master, text='File path:',
                                       font=("Calibri", 12, 'bold')) \
             .pack(side=tk.TOP)
 
-        self.lbl_path = tk.Label(root, text=self.csv_path,
+        self.lbl_path = tk.Label(self.master, text=self.csv_path,
                                  font=("Calibri", 12))
 
         self.lbl_path.pack(side=tk.TOP)
 
         # Analyse Button
-        self.btn_browse = tk.Button(root,
-                                    text='Analyse data',
-                                    command=self.display_result_tables,
-                                    font=("Calibri", 12)
-                                    ) \
-            .pack(side=tk.TOP, pady=10)
-
-    def create_table(self, heading, csv_file_path, table_frame):
-        """
-        Create a table with generic content and columns.
-
-        :param heading: Heading of table
-        :param csv_file_path: Path to csv file containing content
-        :param table_frame: Frame to which table is added to
-        :return: Frame containing table
-        """
+        self.btn_analyse = tk.Button(self.master,
+                                     text='Analyse data',
+                                     command=self.display_result_tables,
+                                     font=("Calibri", 12))
 
-        # Load csv file
-        with open(csv_file_path) as csv_file:
-            reader = csv.DictReader(csv_file, delimiter=',')
+        self.btn_analyse.pack(side=tk.TOP, pady=10)
 
-            # Get all column headers
-            table_column_headers = reader.fieldnames
+        # Progress of analysis including status of current stage
+        self.progress_bar = ttk.Progressbar(self.master,
+                                            orient=tk.HORIZONTAL,
+                                            length=300,
+                                            mode='determinate',
+                                            maximum=len(worker.STAGES))
 
-            # Define frame for table
-            table_frame = tk.Frame(root, width=20)
-            table_frame.pack(side=tk.TOP)
+        self.progress_bar.pack(side=tk.TOP)
 
-            # Define table heading
-            lbl_table_heading = tk.Label(table_frame,
-                                         text=heading,
-                                         font=("Calibri", 12, 'bold'))
+        self.lbl_status = tk.Label(self.master, text='', font=("Calibri", 12))
 
-            lbl_table_heading.pack(side=tk.TOP, pady=10)
+        self.lbl_status.pack(side=tk.TOP)
 
-            # Define scrollbars
-            scrollbar_x = tk.Scrollbar(table_frame, orient=tk.HORIZONTAL)
-            scrollbar_y = tk.Scrollbar(table_frame, orient=tk.VERTICAL)
+        # Timing breakdown of the last analysis
+        self.lbl_metrics = tk.Label(self.master, text='', font=("Calibri", 10))
 
-            # Define treeview
-            tree = ttk.Treeview(table_frame,
-                                columns=table_column_headers,
-                                height=12,
-                                selectmode="none",
-                                yscrollcommand=scrollbar_y.set,
-                                xscrollcommand=scrollbar_x.set)
-            tree['show'] = 'headings'
-            scrollbar_y.config(command=tree.yview)
-            scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-            scrollbar_x.config(command=tree.xview)
-            scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.lbl_metrics.pack(side=tk.TOP)
 
-            # Add column headers to treeview
-            for i, column_header in enumerate(table_column_headers):
-                tree.heading(column_header, text=column_header, anchor=tk.W)
-                tree.column(i, stretch=tk.NO, minwidth=0, width=150)
+        # Cancel Button, which is only enabled during an analysis
+        self.btn_cancel = tk.Button(self.master,
+                                    text='Cancel',
+                                    command=self.cancel_analysis,
+                                    state=tk.DISABLED,
+                                    font=("Calibri", 12))
 
-            tree.pack()
+        self.btn_cancel.pack(side=tk.TOP, pady=10)
 
-            # For every row of csv table, add row to table
-            index = 0
-            for row in reader:
-                row_values = []
+    def create_table(self, heading, df, table_frame):
+        """
+        Create a table with generic content and columns.
+        Only visible rows are added to the table, so large results
+        are displayed as fast as small ones.
 
-                for column_header in table_column_headers:
-                    row_values.append(row[column_header])
+        :param heading: Heading of table
+        :param df: pandas data frame containing content
+        :param table_frame: Frame to which table is added to
+        :return: Frame containing table
+        """
 
-                tree.insert("", index, values=row_values)
-                index += 1
+        table = VirtualTable(self.master, heading, df)
+        table.frame.pack(side=tk.TOP)
 
-            return table_frame
+        return table.frame
 
     def import_csv_data(self):
         """
@@ -199,9 +194,14 @@ class HotelBookingGUI:
         Display result tables of analysis.
         Containing:
                     - Evaluate user input
-                    - Call logic for analysis
-                    - Create tables representing results
+                    - Start analysis in a background process
+                    - Check progress of analysis
         """
+
+        # Do not start an analysis while another one is running
+        if self.is_analysis_running():
+            return
+
         # Evaluate user input
         output_message = self.evaluate_input()
 
@@ -215,74 +215,145 @@ class HotelBookingGUI:
             # Reset tables
             self.reset_tableview()
 
+            # Run analysis in a separate process, so the window stays
+            # responsive and the analysis can be cancelled
+            self.worker_queue = multiprocessing.Queue()
+            self.worker_process = multiprocessing.Process(
+                target=worker.run_analysis,
+                args=(self.csv_path, self.date.get(), 7, self.worker_queue),
+                daemon=True)
+            self.worker_process.start()
+
+            self.set_running(True)
+            self.progress_bar['value'] = 0
+            self.metrics = []
+            self.master.after(100, self.check_progress)
+
+    def check_progress(self):
+        """
+        Handle progress messages of the running analysis.
+        Containing:
+                    - Update progress bar and status
+                    - Create tables of finished stages
+                    - Show error message of failed stage
+        """
+
+        if self.worker_process is None:
+            return
+
+        while True:
             try:
+                message = self.worker_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            status, stage = message[0], message[1]
+            stage_index = [name for name, _ in worker.STAGES].index(stage)
+
+            if status == 'started':
+                self.lbl_status['text'] = \
+                    dict(worker.STAGES)[stage] + '...'
+
+            elif status == 'metrics':
+                self.metrics.append(message[2])
+
+            # Create tables from results, while they are saved
+            elif status == 'result':
+                # Create table for active bookings
+                if stage == 'active_bookings':
+                    self.table_active_bookings = self.create_table(
+                        setting.RESULT_ACTIVE_BOOKINGS
+                        + ": Currently active bookings",
+                        message[2],
+                        self.table_active_bookings)
+
+                # Create table for estimated total guests per day, which is
+                # replaced by the table of total guests
+                elif stage == 'preview':
+                    self.table_total_guests = self.create_table(
+                        'Estimated total guests per day (%d %% confidence '
+                        'interval)' % round(setting.PREVIEW_CONFIDENCE * 100),
+                        message[2],
+                        self.table_total_guests)
+
+                # Create table for total guests per day
+                elif stage == 'total_guests':
+                    self.table_total_guests.pack_forget()
+                    self.table_total_guests = self.create_table(
+                        setting.RESULT_TOTAL_GUESTS
+                        + ': Total guests per day',
+                        message[2],
+                        self.table_total_guests)
+
+            elif status == 'failed':
+                self.stop_analysis()
+                messagebox.showwarning('Error during analysis',
+                                       STAGE_ERROR_MESSAGES[stage])
+                logging.error('Failed to analyse data (%s): %s',
+                              stage, message[2])
+                return
 
-                # Call logic to import csv data from path and clean it
-                prep.import_clean_data(
-                    self.csv_path,
-                    os.path.join(setting.RAW_DATA_PATH, setting.RAW_NAME),
-                    0.8)
+            elif status == 'finished':
+                self.progress_bar['value'] = stage_index + 1
 
-            except Exception:
-                messagebox.showwarning(
-                    "Error during analysis",
-                    'There has been an error during preparing the data.'
-                    ' Please try again.')
-                logging.error('Failed to import data: ', exc_info=True)
+                if stage_index == len(worker.STAGES) - 1:
+                    self.stop_analysis()
+                    self.lbl_status['text'] = 'Analysis finished.'
+                    self.lbl_metrics['text'] = \
+                        'Last run: ' + format_summary(self.metrics)
+                    return
 
-                return
+        # Check if process ended without reporting a result
+        if not self.worker_process.is_alive() and self.worker_queue.empty():
+            self.stop_analysis()
+            messagebox.showwarning('Error during analysis',
+                                   'The analysis stopped unexpectedly.')
+            logging.error('Analysis process exited with code %s',
+                          self.worker_process.exitcode)
+            return
 
-            # Call logic to analyse active bookings
-            # If successful, create corresponding table
-            # If not successful, show error message and return
-            try:
-                analyse.analyse_active_bookings(
-                    os.path.join(setting.RAW_DATA_PATH, setting.RAW_NAME),
-                    os.path.join(setting.RESULT_DATA_PATH,
-                                 setting.RESULT_ACTIVE_BOOKINGS),
-                    self.date.get(),
-                    7)
-
-            except Exception:
-                messagebox.showwarning(
-                    "Error during analysis",
-                    'Active bookings could not be analysed.')
-                logging.error('Failed to analyse bookings: ', exc_info=True)
+        self.master.after(100, self.check_progress)
 
-                return
+    def cancel_analysis(self):
+        """
+        Cancel running analysis by terminating its process.
+        """
 
-            # Create table for active bookings
-            self.table_active_bookings = self.create_table(
-                setting.RESULT_ACTIVE_BOOKINGS + ": Currently active bookings",
-                os.path.join(setting.RESULT_DATA_PATH,
-                             setting.RESULT_ACTIVE_BOOKINGS),
-                self.table_active_bookings)
+        if self.is_analysis_running():
+            self.worker_process.terminate()
+            self.stop_analysis()
+            self.lbl_status['text'] = 'Analysis cancelled.'
 
-            # Call logic to analyse total guest per day
-            # If successful, create corresponding table
-            # If not successful, show error message
-            try:
-                analyse.analyse_total_guests(
-                    os.path.join(setting.RAW_DATA_PATH, setting.RAW_NAME),
-                    os.path.join(setting.RESULT_DATA_PATH,
-                                 setting.RESULT_TOTAL_GUESTS),
-                    self.date.get(),
-                    7)
-
-            except Exception:
-                messagebox.showwarning(
-                    'Error during analysis',
-                    'Total guests could not be analysed.'
-                )
-                logging.error('Failed to analyse total guests: ', exc_info=True)
-                return
+    def stop_analysis(self):
+        """
+        Clean up after the analysis finished, failed or was cancelled.
+        """
+
+        self.worker_process.join()
+        self.worker_process = None
+        self.worker_queue = None
+        self.set_running(False)
+
+    def is_analysis_running(self):
+        """
+        Check if an analysis is running.
 
-            # Create table for total guests per day
-            self.table_total_guests = self.create_table(
-                setting.RESULT_TOTAL_GUESTS + ': Total guests per day',
-                os.path.join(setting.RESULT_DATA_PATH,
-                             setting.RESULT_TOTAL_GUESTS),
-                self.table_total_guests)
+        :return: True, if an analysis is running
+        """
+
+        return self.worker_process is not None \
+            and self.worker_process.is_alive()
+
+    def set_running(self, running):
+        """
+        Enable or disable buttons depending on whether an analysis is
+        running.
+
+        :param running: True, if an analysis is running
+        """
+
+        self.btn_analyse['state'] = tk.DISABLED if running else tk.NORMAL
+        self.btn_cancel['state'] = tk.NORMAL if running else tk.DISABLED
 
     def evaluate_input(self):
         """
@@ -318,11 +389,17 @@ class HotelBookingGUI:
             self.table_active_bookings.pack_forget()
 
 
-root = tk.Tk()
-gui = HotelBookingGUI(root)
+def main():
+    """
+    Start graphical user interface of application.
+    """
+    multiprocessing.freeze_support()
+
+    root = tk.Tk()
+    HotelBookingGUI(root)
+    root.mainloop()
 
-root.mainloop()
 
 # ============================INITIALIZATION==============================
 if __name__ == '__main__':
-    root.mainloop()
+    main()
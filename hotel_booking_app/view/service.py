@@ -0,0 +1,260 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Local query service for hotel bookings"
+
+#######################################################################
+
+import collections
+import datetime as dt
+import json
+import logging
+import os.path
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+import hotel_booking_app.src.processing.occupancy as occupancy
+import hotel_booking_app.src.preparation.prepare_data as prep
+from hotel_booking_app.src.validation import parse_span
+from hotel_booking_app.src.preparation.data_cache import file_hash
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+
+
+class ResultCache:
+    """
+    Class that represents a thread-safe cache of query results,
+    which removes the least recently used result if it is full.
+    """
+
+    def __init__(self, max_size):
+        """
+        Initialize class ResultCache
+
+        :param max_size: Maximum number of cached results
+        """
+        self.max_size = max_size
+        self.results = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get cached result.
+
+        :param key: Key of result
+        :return: Result or None, if it is not cached
+        """
+        with self.lock:
+            if key not in self.results:
+                return None
+
+            self.results.move_to_end(key)
+            return self.results[key]
+
+    def put(self, key, result):
+        """
+        Cache result.
+
+        :param key: Key of result
+        :param result: Result
+        """
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+
+            if len(self.results) > self.max_size:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        with self.lock:
+            self.results.clear()
+
+
+class BookingService:
+    """
+    Class that holds a prepared booking dataset in memory and answers
+    active bookings and total guests queries. Results are cached by
+    dataset hash, date, time span and filters. The dataset is reloaded,
+    if the csv file changed.
+    """
+
+    def __init__(self, csv_path, threshold, cache_size, data_cache=None):
+        """
+        Initialize class BookingService
+
+        :param csv_path: Path of csv file containing relevant data
+        :param threshold: Maximum NaN percentage of a column
+        :param cache_size: Maximum number of cached results
+        :param data_cache: DataCache for prepared data (optional)
+        """
+        self.csv_path = csv_path
+        self.threshold = threshold
+        self.data_cache = data_cache
+        self.result_cache = ResultCache(cache_size)
+        self.lock = threading.Lock()
+        self.file_state = None
+        self.dataset_hash = None
+        self.dataset = None
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Load dataset again and clear cached results, if size or
+        modification time of the csv file changed.
+        """
+
+        stat = os.stat(self.csv_path)
+        file_state = (stat.st_size, stat.st_mtime_ns)
+
+        with self.lock:
+            if file_state == self.file_state:
+                return
+
+            dataset_hash = file_hash(self.csv_path)
+
+            if dataset_hash != self.dataset_hash:
+                # The dataset stays in memory, so it is not saved again
+                self.dataset = BookingDataset(prep.import_clean_data(
+                    self.csv_path,
+                    None,
+                    self.threshold,
+                    self.data_cache))
+                self.dataset_hash = dataset_hash
+                self.result_cache.clear()
+                logging.info('Loaded dataset %s (%s)',
+                             self.csv_path, dataset_hash)
+
+            self.file_state = file_state
+
+    def query(self, result_name, selected_date, time_span, filters):
+        """
+        Get result of query as JSON.
+
+        :param result_name: Either 'active-bookings' or 'total-guests'
+        :param selected_date: Date in YYYY-MM-DD format
+        :param time_span: Time span in which guests should arrive (in days)
+        :param filters: Dictionary of column name and value, bookings must
+                        match
+        :return: JSON encoded result
+        """
+
+        self.refresh()
+
+        dataset, dataset_hash = self.dataset, self.dataset_hash
+        key = (dataset_hash, result_name, selected_date, time_span,
+               tuple(sorted(filters.items())))
+
+        result = self.result_cache.get(key)
+        if result is not None:
+            return result
+
+        unknown_columns = set(filters) - set(dataset.data.columns)
+        if unknown_columns:
+            raise ValueError('Unknown filter columns: %s'
+                             % ', '.join(sorted(unknown_columns)))
+
+        df_active_bookings = dataset.get_active_bookings(selected_date,
+                                                         time_span)
+
+        # Keep bookings, whose column values match all filters
+        for column, value in filters.items():
+            df_active_bookings = df_active_bookings.loc[
+                df_active_bookings[column].astype(str) == value]
+
+        if result_name == 'active-bookings':
+            df_result = df_active_bookings.drop(occupancy.DAY_COLUMNS, axis=1)
+        else:
+            df_result = occupancy.calculate_total_guests(df_active_bookings,
+                                                         selected_date,
+                                                         time_span)
+            df_result['stayed_date'] = \
+                df_result['stayed_date'].dt.strftime('%Y-%m-%d')
+
+        result = df_result.to_json(orient='records').encode('utf-8')
+        self.result_cache.put(key, result)
+
+        return result
+
+
+class BookingRequestHandler(BaseHTTPRequestHandler):
+    """
+    Class that handles HTTP requests of the booking service.
+
+    - GET /active-bookings?date=YYYY-MM-DD&span=7[&column=value...]
+    - GET /total-guests?date=YYYY-MM-DD&span=7[&column=value...]
+    """
+
+    def do_GET(self):
+        """
+        Answer query of active bookings or total guests.
+        """
+
+        url = urlparse(self.path)
+        result_name = url.path.strip('/')
+
+        if result_name not in ('active-bookings', 'total-guests'):
+            self.send_json(404, json.dumps({'error': 'Not found'}))
+            return
+
+        filters = dict(parse_qsl(url.query))
+
+        try:
+            selected_date = dt.date.fromisoformat(
+                filters.pop('date', '')).isoformat()
+            time_span = parse_span(filters.pop('span', 7))
+            result = self.server.service.query(result_name, selected_date,
+                                               time_span, filters)
+        except ValueError as error:
+            self.send_json(400, json.dumps({'error': str(error)}))
+            return
+        except Exception:
+            logging.error('Failed to answer query: ', exc_info=True)
+            self.send_json(500, json.dumps({'error': 'Query failed'}))
+            return
+
+        self.send_json(200, result)
+
+    def send_json(self, status, body):
+        """
+        Send JSON response.
+
+        :param status: HTTP status code
+        :param body: JSON encoded body
+        """
+
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(csv_path, port, threshold=0.8, cache_size=256, data_cache=None):
+    """
+    Run booking service on localhost until it is interrupted.
+
+    :param csv_path: Path of csv file containing relevant data
+    :param port: Port of service
+    :param threshold: Maximum NaN percentage of a column
+    :param cache_size: Maximum number of cached results
+    :param data_cache: DataCache for prepared data (optional)
+    """
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), BookingRequestHandler)
+    server.service = BookingService(csv_path, threshold, cache_size,
+                                    data_cache)
+
+    print('Serving bookings of %s on http://127.0.0.1:%d'
+          % (csv_path, server.server_address[1]))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,231 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Table, that only loads visible rows"
+
+#######################################################################
+
+import tkinter as tk
+import tkinter.ttk as ttk
+import numpy as np
+
+
+class VirtualTable:
+    """
+    Class that represents a table, which only inserts the visible rows
+    plus a buffer into the treeview. Rows are loaded on scrolling.
+    Sorting and filtering is done on the backing data frame.
+    """
+
+    def __init__(self, master, heading, df, page_size=12, buffer_size=50):
+        """
+        Initialize class VirtualTable
+
+        :param master: Parent widget of table
+        :param heading: Heading of table
+        :param df: pandas data frame containing content
+        :param page_size: Number of visible rows
+        :param buffer_size: Number of rows loaded before and after the
+                            visible rows
+        """
+        self.data = df.reset_index(drop=True)
+
+        # Show dates without time, as they are saved in result files
+        for column in self.data.columns:
+            if self.data[column].dtype.kind == 'M':
+                self.data[column] = self.data[column].dt.date
+        self.text_data = None
+        self.heading = heading
+        self.page_size = page_size
+        self.buffer_size = buffer_size
+
+        # Row positions of backing data frame in displayed order
+        self.view_positions = np.arange(len(self.data))
+        self.sort_positions = self.view_positions
+        self.sort_column = None
+        self.sort_ascending = True
+
+        # First visible row and range of rows inserted into treeview
+        self.offset = 0
+        self.loaded_start = 0
+        self.loaded_end = 0
+
+        self.filter_text = tk.StringVar()
+
+        self.frame = tk.Frame(master, width=20)
+
+        self.lbl_heading = tk.Label(self.frame, text=heading,
+                                    font=("Calibri", 12, 'bold'))
+
+        self.lbl_heading.pack(side=tk.TOP, pady=10)
+
+        # Filter input, applied on return
+        filter_frame = tk.Frame(self.frame)
+        filter_frame.pack(side=tk.TOP, fill=tk.X)
+
+        tk.Label(filter_frame, text='Filter:', font=("Calibri", 12)) \
+            .pack(side=tk.LEFT)
+
+        entry_filter = tk.Entry(filter_frame, textvariable=self.filter_text)
+        entry_filter.bind('<Return>', lambda event: self.apply_filter())
+        entry_filter.pack(side=tk.LEFT)
+
+        # Define scrollbars
+        scrollbar_x = tk.Scrollbar(self.frame, orient=tk.HORIZONTAL)
+        self.scrollbar_y = tk.Scrollbar(self.frame, orient=tk.VERTICAL,
+                                        command=self.on_scrollbar)
+
+        # Define treeview
+        columns = list(self.data.columns)
+        self.tree = ttk.Treeview(self.frame,
+                                 columns=columns,
+                                 height=page_size,
+                                 selectmode="none",
+                                 xscrollcommand=scrollbar_x.set)
+        self.tree['show'] = 'headings'
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        scrollbar_x.config(command=self.tree.xview)
+        scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+
+        # Add column headers to treeview, sorting the table on click
+        for i, column_header in enumerate(columns):
+            self.tree.heading(column_header, text=column_header, anchor=tk.W,
+                              command=lambda column=column_header:
+                              self.sort(column))
+            self.tree.column(i, stretch=tk.NO, minwidth=0, width=150)
+
+        # Scroll table instead of loaded rows only
+        self.tree.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.tree.bind('<Button-4>', lambda event: self.scroll_to(
+            self.offset - 1))
+        self.tree.bind('<Button-5>', lambda event: self.scroll_to(
+            self.offset + 1))
+
+        self.tree.pack()
+
+        self.load_rows()
+
+    def load_rows(self):
+        """
+        Insert rows around the first visible row into treeview
+        and update scrollbar.
+        """
+
+        n_rows = len(self.view_positions)
+        self.offset = max(0, min(self.offset, n_rows - self.page_size))
+
+        # Reload rows, if visible rows are not within loaded rows
+        if self.offset < self.loaded_start \
+                or min(n_rows, self.offset + self.page_size) \
+                > self.loaded_end:
+            self.loaded_start = max(0, self.offset - self.buffer_size)
+            self.loaded_end = min(n_rows, self.offset + self.page_size
+                                  + self.buffer_size)
+
+            df_rows = self.data.iloc[
+                self.view_positions[self.loaded_start:self.loaded_end]]
+
+            self.tree.delete(*self.tree.get_children())
+            for row_values in df_rows.astype(object) \
+                    .where(df_rows.notnull(), '').values.tolist():
+                self.tree.insert("", tk.END, values=row_values)
+
+        loaded_rows = max(1, self.loaded_end - self.loaded_start)
+        self.tree.yview_moveto((self.offset - self.loaded_start)
+                               / loaded_rows)
+
+        if n_rows:
+            self.scrollbar_y.set(self.offset / n_rows,
+                                 (self.offset + self.page_size) / n_rows)
+        else:
+            self.scrollbar_y.set(0, 1)
+
+        self.lbl_heading['text'] = '%s (%d of %d rows)' \
+                                   % (self.heading, n_rows, len(self.data))
+
+    def reload_rows(self):
+        """
+        Reload rows after order or filter of rows changed.
+        """
+
+        self.loaded_start = 0
+        self.loaded_end = -1
+        self.load_rows()
+
+    def scroll_to(self, offset):
+        """
+        Scroll to row.
+
+        :param offset: Position of first visible row
+        """
+
+        self.offset = int(offset)
+        self.load_rows()
+
+        return 'break'
+
+    def on_scrollbar(self, *args):
+        """
+        Scroll table on moving vertical scrollbar.
+
+        :param args: Arguments of scrollbar command
+        """
+
+        if args[0] == 'moveto':
+            self.scroll_to(float(args[1]) * len(self.view_positions))
+        elif args[0] == 'scroll':
+            step = self.page_size if args[2] == 'pages' else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def on_mouse_wheel(self, event):
+        """
+        Scroll table on mouse wheel.
+
+        :param event: Mouse wheel event
+        """
+
+        return self.scroll_to(self.offset - int(np.sign(event.delta)) * 3)
+
+    def sort(self, column):
+        """
+        Sort rows by column. Clicking the same column again reverses order.
+
+        :param column: Name of column
+        """
+
+        if self.sort_column == column:
+            self.sort_ascending = not self.sort_ascending
+        else:
+            self.sort_column = column
+            self.sort_ascending = True
+
+        self.sort_positions = self.data[column] \
+            .sort_values(ascending=self.sort_ascending, kind='mergesort',
+                         na_position='last').index.to_numpy()
+
+        self.apply_filter()
+
+    def apply_filter(self):
+        """
+        Show only rows, that contain filter text in any column.
+        """
+
+        text = self.filter_text.get().strip()
+
+        if not text:
+            self.view_positions = self.sort_positions
+        else:
+            # Convert data to text once, when filtering the first time
+            if self.text_data is None:
+                self.text_data = self.data.astype(str) \
+                    .where(self.data.notnull(), '')
+
+            mask = np.zeros(len(self.data), dtype=bool)
+            for column in self.text_data.columns:
+                mask |= self.text_data[column].str.contains(
+                    text, case=False, regex=False).to_numpy()
+
+            self.view_positions = self.sort_positions[
+                mask[self.sort_positions]]
+
+        self.offset = 0
+        self.reload_rows()
@@ -0,0 +1,142 @@
+#######################################################################
+__author__ = "Miriam Aydt"
+__program__ = "Run analysis in a background process"
+
+#######################################################################
+
+import os.path
+import logging
+import threading
+import traceback
+import hotel_booking_app.src.processing.analyse_data as analyse
+import hotel_booking_app.src.processing.preview as preview
+import hotel_booking_app.src.preparation.prepare_data as prep
+from hotel_booking_app.src.processing.booking_dataset import BookingDataset
+from hotel_booking_app.src.preparation.data_cache import DataCache
+from hotel_booking_app.src.instrumentation import Instrumentation
+from hotel_booking_app.src.export import ResultExporter
+import hotel_booking_app.settings as setting
+
+# Stages of analysis and their status text
+STAGES = [('preview', 'Estimating total guests'),
+          ('import', 'Importing data'),
+          ('active_bookings', 'Analysing active bookings'),
+          ('total_guests', 'Analysing total guests'),
+          ('export', 'Saving results')]
+
+# Maximum NaN percentage of a column
+THRESHOLD = 0.8
+
+
+def run_analysis(csv_path, selected_date, time_span, queue):
+    """
+    Prepare data and analyse active bookings and total guests.
+    Total guests are estimated from a sample of bookings first.
+    Results are sent on the queue as data frames and saved in the
+    background, so they can be displayed before they are saved.
+    Progress is reported by putting messages on the queue:
+
+    - ('started', stage) before a stage is run
+    - ('finished', stage) after a stage was successful
+    - ('result', stage, data frame) after an analysis stage, before its
+      result is saved
+    - ('failed', stage, traceback) if a stage failed
+    - ('metrics', stage, record) after a step of a stage was measured
+
+    :param csv_path: Path of csv file containing relevant data
+    :param selected_date: Date in YYYY-MM-DD format
+    :param time_span: Time span in which guests should arrive (in days)
+    :param queue: multiprocessing queue for progress messages
+    """
+
+    results = {}
+    current_stage = [None]
+    main_thread = threading.current_thread()
+
+    def send_metrics(record):
+        # Results are saved in the thread of the exporter, while the
+        # stages run in this thread
+        stage = current_stage[0] \
+            if threading.current_thread() is main_thread else 'export'
+        queue.put(('metrics', stage, record))
+
+    # Send metrics of every measured step, so the timing breakdown of the
+    # run can be shown
+    instrumentation = Instrumentation(setting.METRICS_FILE_PATH,
+                                      [send_metrics])
+    exporter = ResultExporter(instrumentation)
+    cache = DataCache(setting.CACHE_DATA_PATH, setting.CACHE_SIZE_LIMIT)
+
+    def preview_total_guests():
+        # The estimate is shown until total guests are analysed.
+        # A preview is optional, so the analysis continues without it.
+        # Cached data is loaded faster than a sample is drawn, so there
+        # is no preview then.
+        try:
+            if cache.contains(csv_path, THRESHOLD):
+                return
+
+            df_preview = preview.preview_total_guests(
+                csv_path, selected_date, time_span,
+                setting.PREVIEW_SAMPLE_SIZE, setting.PREVIEW_CONFIDENCE)
+        except Exception:
+            logging.warning('Total guests could not be estimated: %s',
+                            traceback.format_exc())
+            return
+
+        queue.put(('result', 'preview', df_preview))
+
+    def import_data():
+        # Call logic to import csv data from path and clean it.
+        # The cleaned data is loaded once and shared by all analyses,
+        # so it is not saved as csv file
+        df = prep.import_clean_data(
+            csv_path,
+            None,
+            THRESHOLD,
+            cache,
+            instrumentation)
+
+        with instrumentation.step('derive_dates', df.shape[0]) as measured:
+            results['dataset'] = BookingDataset(df)
+            measured.rows_out = results['dataset'].data.shape[0]
+
+    def analyse_active_bookings():
+        queue.put(('result', 'active_bookings',
+                   analyse.analyse_active_bookings(
+                       results['dataset'],
+                       os.path.join(setting.RESULT_DATA_PATH,
+                                    setting.RESULT_ACTIVE_BOOKINGS),
+                       selected_date,
+                       time_span,
+                       instrumentation,
+                       exporter)))
+
+    def analyse_total_guests():
+        queue.put(('result', 'total_guests',
+                   analyse.analyse_total_guests(
+                       results['dataset'],
+                       os.path.join(setting.RESULT_DATA_PATH,
+                                    setting.RESULT_TOTAL_GUESTS),
+                       selected_date,
+                       time_span,
+                       instrumentation,
+                       exporter)))
+
+    stage_functions = {'preview': preview_total_guests,
+                       'import': import_data,
+                       'active_bookings': analyse_active_bookings,
+                       'total_guests': analyse_total_guests,
+                       'export': exporter.close}
+
+    for stage, _ in STAGES:
+        queue.put(('started', stage))
+        current_stage[0] = stage
+
+        try:
+            stage_functions[stage]()
+        except Exception:
+            queue.put(('failed', stage, traceback.format_exc()))
+            return
+
+        queue.put(('finished', stage))